@@ -53,6 +53,9 @@ def get_database():
     connection = {
         "retry": parser.getint("CONNECTION", "retry"),
         "delay": parser.getfloat("CONNECTION", "delay"),
+        "delay_max": parser.getfloat("CONNECTION", "delay_max"),
+        "chunk": parser.getint("CONNECTION", "chunk"),
+        "socket": parser.get("CONNECTION", "socket"),
     }
 
     # extract database session parameters
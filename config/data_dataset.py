@@ -237,9 +237,16 @@ def get_param(config, shape, parallel):
     # dataset computation options
     data_dataset = {
         "n_parallel": n_parallel,  # number of parallel processes
+        "start_method": None,  # start method of the processes (None for the platform default, tuning option)
+        "max_tasks": None,  # number of tasks before recycling the processes (None for no recycling, tuning option)
+        "affinity": False,  # pin the processes to distinct CPUs (not suited for multithreaded processes)
+        "warmup": [  # modules imported at the startup of the processes
+            "pyfreecoil.solver.solver",
+            "pypeec.run.mesher",
+            "pypeec.run.solver",
+        ],
         "method_sweep": method_sweep,  # dataset generation method ("array" for specified designs)
         "delay_collect": 120.0,  # poll delays (in seconds) for flushing results into the database
-        "delay_timeout": 1.0,  # timeout delays (in seconds) waiting results from the process pool
     }
 
     # append the data
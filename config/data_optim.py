@@ -31,6 +31,7 @@ def _get_data_solver(solver):
             "cond": True,  # use (or not) the constraint function
             "sampler": "TPE",  # name of the sampling method ("TPE" or "CmaEs")
             "n_trial": int(10e6),  # maximum number of sampler trials
+            "n_log": 10,  # number of trials between the log outputs
         }
     elif solver == "nevergrad":
         # global optimizer, good constraint support, good performance
@@ -60,6 +61,8 @@ def _get_data_solver(solver):
                 "n_retry": 100,  # maximum number of iterations for enforcing constraints
                 "frac_stop": 0.90,  # fraction of the population that should be valid
                 "cond_thr": 0.0,  # constraint threshold for considering a design valid
+                "p_smooth": 0.3,  # smoothing factor for the rolling validity rate of the offsprings
+                "p_min": 0.05,  # lower bound for the validity rate (limit the number of operator calls)
             },
         }
     elif solver == "simplex":
@@ -134,12 +137,16 @@ def _get_data_solver(solver):
     # determine the maximum number of function evaluations
     n_eval_max = int(50e3)
 
+    # number of calls without improvement between the convergence checks
+    n_check = 5
+
     # convergence data
     convergence = {
         "n_eval_conv": n_eval_conv,
         "n_eval_init": n_eval_init,
         "n_eval_max": n_eval_max,
         "tol_conv_cmp": tol_conv_cmp,
+        "n_check": n_check,
     }
 
     # solver data
@@ -252,6 +259,14 @@ def get_param(config, seed, solver, parallel):
         "cond_solve": cond_solve,  # constraint threshold for solving a design after applying the design rules
         "obj_keep": obj_keep,  # objective function threshold for writing the designs in the database
         "n_parallel": n_parallel,  # number of parallel processes
+        "start_method": None,  # start method of the processes (None for the platform default, tuning option)
+        "max_tasks": None,  # number of tasks before recycling the processes (None for no recycling, tuning option)
+        "affinity": False,  # pin the processes to distinct CPUs (not suited for multithreaded processes)
+        "warmup": [  # modules imported at the startup of the processes
+            "pyfreecoil.solver.solver",
+            "pypeec.run.mesher",
+            "pypeec.run.solver",
+        ],
     }
 
     # append the data
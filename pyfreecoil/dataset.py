@@ -96,8 +96,11 @@ def get_run(name, dataset_param):
     # extract
     method_sweep = data_dataset["method_sweep"]
     delay_collect = data_dataset["delay_collect"]
-    delay_timeout = data_dataset["delay_timeout"]
     n_parallel = data_dataset["n_parallel"]
+    start_method = data_dataset["start_method"]
+    max_tasks = data_dataset["max_tasks"]
+    affinity = data_dataset["affinity"]
+    warmup = data_dataset["warmup"]
 
     # wrapper object handling the design generation
     obj_wrapper = wrapper_dataset.DatasetWrapper(
@@ -126,16 +129,20 @@ def get_run(name, dataset_param):
         _run_collect(name, obj_sql, design, n_count, n_total)
 
     # create a multiprocessing pool
+    #   - the pool is closed at the end of the context
+    #   - the pool is terminated if an exception occurs
+    #   - the designs are sent one by one (slow tasks, results collected as completed)
     LOGGER.info("create worker pool")
-    obj_pool = manage_pool.QueuePool(n_parallel, delay_collect, delay_timeout, fct_collect, fct_compute)
-
-    # generate the design in parallel
-    LOGGER.info("run data")
-    obj_pool.get_loop(*args)
-
-    # close the parallel pool and the database
-    LOGGER.info("close pool/database")
-    obj_pool.close()
+    with manage_pool.QueuePool(
+        n_parallel, delay_collect, fct_collect, fct_compute, chunksize=1,
+        start_method=start_method, max_tasks=max_tasks, affinity=affinity, warmup=warmup,
+    ) as obj_pool:
+        # generate the design in parallel
+        LOGGER.info("run data")
+        obj_pool.get_loop(*args)
+
+    # close the database
+    LOGGER.info("close database")
     obj_sql.close()
 
     LOGGER.info("====================== END: %s" % name)
@@ -16,7 +16,6 @@ __license__ = "Mozilla Public License Version 2.0"
 
 import numpy as np
 import pandas as pd
-from pyfreecoil.solver import solver
 from pyfreecoil.design import manager_design
 from pyfreecoil.design import manager_objective
 from pyfreecoil.utils import manage_trace
@@ -28,6 +27,9 @@ def get_check(design, data_component):
     For exception handling, this method is generating a traceback and ignoring the exception.
     """
 
+    # the solver is only loaded when required (heavy imports)
+    from pyfreecoil.solver import solver
+
     try:
         data_coil = get_data_coil(design)
         data_vector = solver.run_parse(data_coil, data_component)
@@ -46,11 +48,14 @@ def get_solve(design, data_component, data_tolerance):
     For exception handling, this method is generating a traceback and ignoring the exception.
     """
 
+    # the solver is only loaded when required (heavy imports)
+    from pyfreecoil.solver import solver
+
     try:
         data_coil = get_data_coil(design)
         data_vector = solver.run_parse(data_coil, data_component)
         data_voxel = solver.run_mesh(data_vector, data_component)
-        (data_solution, data_peec) = solver.run_solve(data_voxel, data_component, data_tolerance)
+        (_, data_peec) = solver.run_solve(data_voxel, data_component, data_tolerance, return_solution=False)
         design = manager_design.add_data_peec(design, data_peec)
     except Exception as ex:
         args = (design, data_component, data_tolerance)
@@ -19,9 +19,9 @@ from pyfreecoil.utils import manage_sql
 LOGGER = scilogger.get_logger(__name__, "planar")
 
 
-def get_dump(data_database, filename):
+def get_dump(data_database, filename, n_jobs):
     """
-    Backup the database in a file (dump).
+    Backup the database in a directory (dump).
     """
 
     LOGGER.info("====================== START: manage / dump")
@@ -31,14 +31,14 @@ def get_dump(data_database, filename):
     obj_sql = manage_sql.ManageSql(data_database, var_sql, False)
 
     LOGGER.info("dump / db")
-    obj_sql.dump(filename)
+    obj_sql.dump(filename, n_jobs)
 
     LOGGER.info("====================== END: manage / dump")
 
 
-def get_restore(data_database, filename):
+def get_restore(data_database, filename, n_jobs):
     """
-    Restore the database from a file (restore).
+    Restore the database from a directory (restore).
     """
 
     LOGGER.info("====================== START: manage / restore")
@@ -48,7 +48,7 @@ def get_restore(data_database, filename):
     obj_sql = manage_sql.ManageSql(data_database, var_sql, False)
 
     LOGGER.info("restore / db")
-    obj_sql.restore(filename)
+    obj_sql.restore(filename, n_jobs)
 
     LOGGER.info("====================== END: manage / restore")
 
@@ -47,6 +47,10 @@ def get_run(name, optim_param):
 
     # extract
     n_parallel = data_optim["n_parallel"]
+    start_method = data_optim["start_method"]
+    max_tasks = data_optim["max_tasks"]
+    affinity = data_optim["affinity"]
+    warmup = data_optim["warmup"]
     cond_solve = data_optim["cond_solve"]
     obj_keep = data_optim["obj_keep"]
 
@@ -92,9 +96,16 @@ def get_run(name, optim_param):
     (bnd, x_fixed, x_init, obj_init) = wrapper_optim.get_bnd_init(design, data_encoding, data_objective)
 
     # create a multiprocessing pool
+    #   - the objective and constraint functions share the processes
+    #   - the wrapper data are pickled once per process
+    #   - the designs are sent one by one (slow tasks with different run times)
     LOGGER.info("create worker pool")
-    obj_pool_obj = manage_pool.FctPool(n_parallel, obj_wrapper.get_obj)
-    obj_pool_cond = manage_pool.FctPool(n_parallel, obj_wrapper.get_cond)
+    obj_backend = manage_pool.get_backend(
+        n_parallel, [obj_wrapper.get_obj, obj_wrapper.get_cond],
+        start_method=start_method, max_tasks=max_tasks, affinity=affinity, warmup=warmup,
+    )
+    obj_pool_obj = manage_pool.FctPool(n_parallel, obj_wrapper.get_obj, chunksize=1, backend=obj_backend)
+    obj_pool_cond = manage_pool.FctPool(n_parallel, obj_wrapper.get_cond, chunksize=1, backend=obj_backend)
 
     # parallel function for evaluating the objective function
     #   - evaluate the designs in parallel
@@ -123,10 +134,11 @@ def get_run(name, optim_param):
                 #   - useful for vectorized optimizers
                 #       - useful for vectorized optimizers
                 #       - avoid the Python GIL
-                x_fixed_mat = np.tile(x_fixed, [len(x_tmp), 1])
-                cond_solve_vec = np.tile(cond_solve, len(x_tmp))
-                obj_keep_vec = np.tile(obj_keep, len(x_tmp))
-                out_tmp = obj_pool_obj.get_loop(x_tmp, x_fixed_mat, cond_solve_vec, obj_keep_vec)
+                #   - the constant arguments are shared (pickled once per chunk)
+                x_fixed_vec = [x_fixed] * len(x_tmp)
+                cond_solve_vec = [cond_solve] * len(x_tmp)
+                obj_keep_vec = [obj_keep] * len(x_tmp)
+                out_tmp = obj_pool_obj.get_loop(x_tmp, x_fixed_vec, cond_solve_vec, obj_keep_vec)
                 (obj_tmp, design_tmp) = tuple(zip(*out_tmp))
 
                 # cast
@@ -161,8 +173,9 @@ def get_run(name, optim_param):
                 #   - useful for vectorized optimizers
                 #       - useful for vectorized optimizers
                 #       - avoid the Python GIL
-                x_fixed_mat = np.tile(x_fixed, [len(x_tmp), 1])
-                cond_tmp = obj_pool_cond.get_loop(x_tmp, x_fixed_mat)
+                #   - the constant arguments are shared (pickled once per chunk)
+                x_fixed_vec = [x_fixed] * len(x_tmp)
+                cond_tmp = obj_pool_cond.get_loop(x_tmp, x_fixed_vec)
 
                 # cast
                 cond_tmp = np.array(cond_tmp, dtype=np.float64)
@@ -179,6 +192,7 @@ def get_run(name, optim_param):
     LOGGER.info("close pool/database")
     obj_pool_obj.close()
     obj_pool_cond.close()
+    obj_backend.close()
     obj_sql.close()
 
     LOGGER.info("====================== END: %s" % name)
@@ -43,6 +43,7 @@ class _FunctionEval:
         self.n_eval_conv = convergence["n_eval_conv"]
         self.n_eval_init = convergence["n_eval_init"]
         self.tol_conv_cmp = convergence["tol_conv_cmp"]
+        self.n_check = convergence["n_check"]
 
         # thread lock semaphore
         self.lock = threading.Semaphore()
@@ -60,6 +61,10 @@ class _FunctionEval:
         # init best objective
         self.obj_best = np.PINF
 
+        # init the state of the convergence check
+        self.obj_best_check = np.PINF
+        self.n_stall_check = 0
+
     @staticmethod
     def _thread_lock(function):
         """
@@ -183,6 +188,15 @@ class _FunctionEval:
         if self.n_eval_obj < np.maximum(self.n_eval_init, self.n_eval_conv):
             return False
 
+        # without improvement, the convergence is only checked every n_check calls
+        if self.obj_best < self.obj_best_check:
+            self.obj_best_check = self.obj_best
+            self.n_stall_check = 0
+        else:
+            self.n_stall_check += 1
+            if (self.n_stall_check % self.n_check) != 0:
+                return False
+
         # get the objective function comparison value
         obj_cmp = np.min(self.obj_list[:-self.n_eval_conv])
 
@@ -1,6 +1,6 @@
 """
 Global optimization with the "nevergrad" library.
-Support parallel computing (multithreading).
+Support parallel computing (vectorized).
 Support constraint function (good support).
 """
 
@@ -10,7 +10,6 @@ __license__ = "Mozilla Public License Version 2.0"
 
 import nevergrad
 import numpy as np
-import concurrent.futures
 
 
 class SolverConvergenceError(RuntimeError):
@@ -21,14 +20,28 @@ class SolverConvergenceError(RuntimeError):
     pass
 
 
-def _get_fitness(x, obj_eval):
+def _get_cast(x, discrete):
     """
-    Call the objective function
+    Round the discrete variables (the parameter space is continuous).
+    The rounding is done in place (masked, no array allocation).
+    """
+
+    np.rint(x, out=x, where=discrete)
+
+
+def _get_fitness(candidate, x_buffer, discrete, obj_eval):
+    """
+    Call the objective function (for a batch of candidates).
     Log the results, show the log results, and check for convergence.
     """
 
-    # cast
-    x = np.array(x, dtype=np.float64)
+    # stack the candidates (into the preallocated buffer)
+    x = x_buffer[0:len(candidate)]
+    for idx, candidate_tmp in enumerate(candidate):
+        x[idx] = candidate_tmp.value
+
+    # round the discrete variables (in place, into the buffer)
+    _get_cast(x, discrete)
 
     # eval and log
     obj = obj_eval.eval_obj(x)
@@ -48,21 +61,24 @@ def _get_fitness(x, obj_eval):
     return obj
 
 
-def _get_constraints(x, obj_eval):
+def _get_constraints(x, discrete, obj_eval):
     """
     Call the constraint function
     Log the results.
     """
 
-    # cast
+    # cast (copy, the parameter value is the internal nevergrad array)
     x = np.array(x, dtype=np.float64)
 
+    # round the discrete variables (in place, into the copy)
+    _get_cast(x, discrete)
+
     # eval and log
     cond = obj_eval.eval_cond(x)
     obj_eval.set_cond(x, cond)
 
-    # correct sign for nevergrad
-    cond = np.negative(cond)
+    # correct sign for nevergrad (scalar, no array allocation)
+    cond = -cond
 
     return cond
 
@@ -78,17 +94,8 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_init, obj_eval, n_parallel, p
     algorithm = parameters["algorithm"]
     n_trial = parameters["n_trial"]
 
-    # define variable types and bounds
-    var_param = []
-    for i in range(n_var):
-        var_tmp = nevergrad.p.Scalar(lower=lb[i], upper=ub[i])
-        if discrete[i]:
-            var_param.append(var_tmp.set_integer_casting())
-        else:
-            var_param.append(var_tmp)
-
-    # set the parameter space
-    parametrization = nevergrad.p.Instrumentation(*var_param)
+    # set the parameter space (single array, the discrete variables are rounded afterward)
+    parametrization = nevergrad.p.Array(shape=(n_var,), lower=lb, upper=ub)
 
     # create the optimizer
     solver = nevergrad.optimizers.registry[algorithm]
@@ -96,11 +103,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_init, obj_eval, n_parallel, p
 
     # constraint function
     def fct_constraints(trial):
-        return _get_constraints(trial[0], obj_eval)
-
-    # objective function
-    def fct_fitness(*args):
-        return _get_fitness(args, obj_eval)
+        return _get_constraints(trial, discrete, obj_eval)
 
     # set constraint using the cheap constraint mechanism
     if cond:
@@ -109,16 +112,26 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_init, obj_eval, n_parallel, p
     # set the initial values
     if recompute:
         for x_init_tmp in x_init:
-            optimizer.suggest(*x_init_tmp)
+            optimizer.suggest(x_init_tmp)
     else:
         for x_init_tmp, obj_tmp in zip(x_init, obj_init):
-            optimizer.suggest(*x_init_tmp)
+            optimizer.suggest(x_init_tmp)
             candidate = optimizer.ask()
             optimizer.tell(candidate, obj_tmp)
 
-    # run the optimizer (with multi-threading)
+    # buffer for the batch of candidates (reused for all the batches)
+    x_buffer = np.empty((n_parallel, n_var), dtype=np.float64)
+
+    # run the optimizer (batch of candidates evaluated with a vectorized call)
+    #   - ask a batch of candidates
+    #   - evaluate the batch (the calls are parallelized by the objective function)
+    #   - tell the objective values
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=n_parallel) as ex:
-            optimizer.minimize(fct_fitness, executor=ex, batch_mode=False)
+        while optimizer.num_ask < n_trial:
+            n_batch = min(n_parallel, n_trial-optimizer.num_ask)
+            candidate = [optimizer.ask() for _ in range(n_batch)]
+            obj = _get_fitness(candidate, x_buffer, discrete, obj_eval)
+            for candidate_tmp, obj_tmp in zip(candidate, obj):
+                optimizer.tell(candidate_tmp, obj_tmp)
     except SolverConvergenceError:
         pass
@@ -17,7 +17,7 @@ warnings.filterwarnings("ignore", module="optuna")
 warnings.filterwarnings("ignore", module="numpy")
 
 
-def _get_fitness(n_var, lb, ub, discrete, obj_eval, trial):
+def _get_fitness(n_var, param_int, param_float, obj_eval, trial):
     """
     Call the objective function
     Log the results.
@@ -27,7 +27,7 @@ def _get_fitness(n_var, lb, ub, discrete, obj_eval, trial):
     assert(isinstance(trial, optuna.trial.Trial)), "invalid data"
 
     # get the sampling point
-    x = _get_param_sampling(n_var, lb, ub, discrete, trial)
+    x = _get_param_sampling(n_var, param_int, param_float, trial)
 
     # eval and log
     obj = obj_eval.eval_obj(x)
@@ -36,7 +36,7 @@ def _get_fitness(n_var, lb, ub, discrete, obj_eval, trial):
     return obj
 
 
-def _get_constraints(n_var, lb, ub, discrete, obj_eval, trial):
+def _get_constraints(n_var, param_int, param_float, obj_eval, trial):
     """
     Call the constraint function
     Log the results.
@@ -46,7 +46,7 @@ def _get_constraints(n_var, lb, ub, discrete, obj_eval, trial):
     assert(isinstance(trial, optuna.trial.FrozenTrial)), "invalid data"
 
     # get the sampling point
-    x = _get_param_sampling(n_var, lb, ub, discrete, trial)
+    x = _get_param_sampling(n_var, param_int, param_float, trial)
 
     # eval and log
     cond = obj_eval.eval_cond(x)
@@ -58,7 +58,7 @@ def _get_constraints(n_var, lb, ub, discrete, obj_eval, trial):
     return cond
 
 
-def _get_callback(study, trial, obj_eval):
+def _get_callback(study, trial, obj_eval, n_log):
     """
     Show the log results and check for convergence
     """
@@ -71,12 +71,13 @@ def _get_callback(study, trial, obj_eval):
     n_gen = trial.number
     obj_tmp = trial.value
 
-    # show log results
-    var_list = [
-        "obj_tmp = %.3f" % obj_tmp,
-        "n_gen = %d" % n_gen
-    ]
-    obj_eval.get_log(var_list)
+    # show log results (only every n_log trials, the trials are cheap)
+    if (n_gen % n_log) == 0:
+        var_list = [
+            "obj_tmp = %.3f" % obj_tmp,
+            "n_gen = %d" % n_gen
+        ]
+        obj_eval.get_log(var_list)
 
     # convergence detection
     status = obj_eval.get_convergence()
@@ -86,49 +87,61 @@ def _get_callback(study, trial, obj_eval):
         study.stop()
 
 
-def _get_param_init(n_var, discrete, x_init):
+def _get_param_split(n_var, lb, ub, discrete):
     """
-    Encode an initial value in the optuna format.
+    Split the variables into integer and float variables.
+    The names and bounds are precomputed (no type dispatch for each trial).
     """
 
-    # init optuna parameters
-    param = {}
+    # init the variable lists
+    param_int = []
+    param_float = []
 
-    # set variables into a dict
+    # assign the variable index, name, and bounds
     for i in range(n_var):
-        # cast
+        param_tmp = (i, "x_%d" % i, lb[i], ub[i])
         if discrete[i]:
-            val_tmp = int(x_init[i])
+            param_int.append(param_tmp)
         else:
-            val_tmp = float(x_init[i])
+            param_float.append(param_tmp)
+
+    return param_int, param_float
+
+
+def _get_param_init(param_int, param_float, x_init):
+    """
+    Encode an initial value in the optuna format.
+    """
 
-        # assign
-        param["x_%d" % i] = val_tmp
+    # init optuna parameters
+    param = {}
+
+    # set integer variables into a dict
+    for i, name, lb_tmp, ub_tmp in param_int:
+        param[name] = int(x_init[i])
+
+    # set float variables into a dict
+    for i, name, lb_tmp, ub_tmp in param_float:
+        param[name] = float(x_init[i])
 
     return param
 
 
-def _get_param_sampling(n_var, lb, ub, discrete, trial):
+def _get_param_sampling(n_var, param_int, param_float, trial):
     """
     Use the optuna sampler to get a single sampling point.
     """
 
     # init variable array
-    x = []
+    x = np.empty(n_var, dtype=np.float64)
 
-    # set sampled values into an array
-    for i in range(n_var):
-        # sampling
-        if discrete[i]:
-            val_tmp = trial.suggest_int("x_%d" % i, lb[i], ub[i])
-        else:
-            val_tmp = trial.suggest_float("x_%d" % i, lb[i], ub[i])
+    # set sampled integer values into an array
+    for i, name, lb_tmp, ub_tmp in param_int:
+        x[i] = trial.suggest_int(name, lb_tmp, ub_tmp)
 
-        # assign
-        x.append(val_tmp)
-
-    # cast
-    x = np.array(x, dtype=np.float64)
+    # set sampled float values into an array
+    for i, name, lb_tmp, ub_tmp in param_float:
+        x[i] = trial.suggest_float(name, lb_tmp, ub_tmp)
 
     return x
 
@@ -142,13 +155,17 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
     cond = parameters["cond"]
     sampler = parameters["sampler"]
     n_trial = parameters["n_trial"]
+    n_log = parameters["n_log"]
 
     # disable optuna log
     optuna.logging.disable_default_handler()
 
+    # split the integer and float variables
+    (param_int, param_float) = _get_param_split(n_var, lb, ub, discrete)
+
     # constraint function
     def fct_contraints(trial):
-        return _get_constraints(n_var, lb, ub, discrete, obj_eval, trial)
+        return _get_constraints(n_var, param_int, param_float, obj_eval, trial)
 
     # create a sampler (with/without constraints)
     if sampler == "TPE":
@@ -161,21 +178,24 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
     else:
         raise ValueError("invalid sampler")
 
-    # create a study
-    study = optuna.create_study(sampler=sampler)
+    # create a study (in-memory storage)
+    #   - the trials are stored in Python objects (no serialization)
+    #   - the SQL and journal storages are slower for a single process
+    storage = optuna.storages.InMemoryStorage()
+    study = optuna.create_study(sampler=sampler, storage=storage)
 
     # set the initial values
     for x_init_tmp in x_init:
-        param = _get_param_init(n_var, discrete, x_init_tmp)
+        param = _get_param_init(param_int, param_float, x_init_tmp)
         study.enqueue_trial(param)
 
     # objective function
     def fct_fitness(trial):
-        return _get_fitness(n_var, lb, ub, discrete, obj_eval, trial)
+        return _get_fitness(n_var, param_int, param_float, obj_eval, trial)
 
     # callback function
     def fct_callback(study, trial):
-        return _get_callback(study, trial, obj_eval)
+        return _get_callback(study, trial, obj_eval, n_log)
 
     # run the optimizer (with multi-threading)
     study.optimize(fct_fitness, n_trials=n_trial, n_jobs=n_parallel, callbacks=[fct_callback])
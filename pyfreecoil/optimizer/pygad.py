@@ -15,12 +15,80 @@ __license__ = "Mozilla Public License Version 2.0"
 
 import pygad
 import numpy as np
+import collections
 
+# maximum size of the discrete gene spaces described with explicit value arrays
+_N_GENE_ARRAY = 1024
 
-def _get_fitness(gad, x, idx, obj_eval):
+
+class _CondCache:
+    """
+    Cache for the constraint function (bounded LRU cache).
+    The cache is keyed with the bytes of the individuals.
+    Avoid the evaluation of the duplicated individuals.
+    """
+
+    def __init__(self, obj_eval, n_cache):
+        """
+        Constructor.
+        """
+
+        # assign
+        self.obj_eval = obj_eval
+        self.n_cache = n_cache
+
+        # init the cache
+        self.cache = collections.OrderedDict()
+
+    def eval_cond(self, x):
+        """
+        Call the constraint function for the individuals that are not cached.
+        """
+
+        # get the keys
+        x = np.asarray(x, dtype=np.float64)
+        key = [x_tmp.tobytes() for x_tmp in x]
+
+        # find the individuals that are not cached
+        idx_eval = {}
+        for idx, key_tmp in enumerate(key):
+            if (key_tmp not in self.cache) and (key_tmp not in idx_eval):
+                idx_eval[key_tmp] = idx
+
+        # evaluate the missing individuals
+        if len(idx_eval) > 0:
+            idx_eval = np.array(list(idx_eval.values()), dtype=np.int64)
+            cond_eval = self.obj_eval.eval_cond(x[idx_eval])
+            for idx, cond_tmp in zip(idx_eval, cond_eval):
+                self.cache[key[idx]] = cond_tmp
+
+        # get the constraints (and update the cache order)
+        cond = np.empty(len(key), dtype=np.float64)
+        for idx, key_tmp in enumerate(key):
+            self.cache.move_to_end(key_tmp)
+            cond[idx] = self.cache[key_tmp]
+
+        # remove the least recently used individuals
+        while len(self.cache) > self.n_cache:
+            self.cache.popitem(last=False)
+
+        return cond
+
+    def clear(self):
+        """
+        Clear the cache.
+        """
+
+        self.cache.clear()
+
+
+def _get_fitness(gad, x, idx, obj_eval, obj_hist):
     """
     Call the objective function
     Log the results.
+
+    The objective values are stored (keyed with the bytes of the individuals).
+    Avoid the evaluation of the individuals that are already evaluated.
     """
 
     # check
@@ -28,17 +96,25 @@ def _get_fitness(gad, x, idx, obj_eval):
     assert isinstance(x, np.ndarray), "invalid data"
     assert (idx is None) or np.issubdtype(type(idx), np.integer), "invalid data"
 
+    # reuse the objective value if the individual is already evaluated
+    key = np.asarray(x, dtype=np.float64).tobytes()
+    if key in obj_hist:
+        return obj_hist[key]
+
     # eval and log
     obj = obj_eval.eval_obj(x)
     obj_eval.set_obj(x, obj)
 
-    # correct sign for pygad
-    obj = np.negative(obj)
+    # correct sign for pygad (scalar, no array allocation)
+    obj = -obj
+
+    # store the objective value
+    obj_hist[key] = obj
 
     return obj
 
 
-def _get_callback(gad, obj_eval):
+def _get_callback(gad, obj_eval, obj_cache):
     """
     Show the log results and check for convergence
     """
@@ -51,15 +127,15 @@ def _get_callback(gad, obj_eval):
     n_pop_gen = gad.generations_completed
     obj_last = gad.last_generation_fitness
 
-    # get the validity of the population
-    cond = obj_eval.eval_cond(x_all)
+    # get the validity of the population (already computed by the operators, cached)
+    cond = obj_cache.eval_cond(x_all)
     n_pop_fail = np.count_nonzero(cond > 0.0)
     n_pop_valid = np.count_nonzero(cond <= 0.0)
 
-    # get the population objective values
-    obj_min = np.min(np.negative(obj_last))
-    obj_max = np.max(np.negative(obj_last))
-    obj_avg = np.mean(np.negative(obj_last))
+    # get the population objective values (pygad sign, no negated copy)
+    obj_min = -np.max(obj_last)
+    obj_max = -np.min(obj_last)
+    obj_avg = -np.mean(obj_last)
 
     # show log results
     var_list = [
@@ -87,47 +163,77 @@ def _get_select_update(offspring, cond, n_goal, cond_thr):
     Keep only the best offsprings (with respect to the validity scores)
     """
 
-    # detect duplicates
-    matrix = offspring.astype(np.float64)
-    (_, idx) = np.unique(matrix, axis=0, return_index=True)
+    # detect duplicates (mixed gene types are stored as objects, cast only if required)
+    matrix = np.asarray(offspring, dtype=np.float64)
+
+    # view the rows as opaque byte strings (fast 1D unique instead of the axis unique)
+    #   - the rows are compared bitwise (negative zeros are not merged, harmless)
+    #   - the indices are sorted to keep the order of the first occurrences
+    matrix = np.ascontiguousarray(matrix)
+    matrix = matrix.view(np.dtype((np.void, matrix.itemsize*matrix.shape[1])))
+    (_, idx) = np.unique(matrix.ravel(), return_index=True)
+    idx = np.sort(idx)
+
+    # ranking key (valid offsprings first, invalid offsprings sorted by validity scores)
+    key = np.where(cond[idx] <= cond_thr, np.NINF, cond[idx])
 
-    # remove duplicates
+    # select the best offsprings (partial sort, the worst offsprings are not sorted)
+    if n_goal < len(key):
+        idx_sort = np.argpartition(key, n_goal-1)[0:n_goal]
+        idx_sort = np.sort(idx_sort)
+    else:
+        idx_sort = np.arange(len(key))
+
+    # sort the selected offsprings (stable sort for keeping the order of the valid offsprings)
+    idx_sort = idx_sort[np.argsort(key[idx_sort], kind="stable")]
+
+    # keep the best offsprings (single gather for removing the duplicates and sorting)
+    idx = idx[idx_sort]
     offspring = offspring[idx]
     cond = cond[idx]
 
-    # split the valid and invalid offsprings
-    idx_valid = cond <= cond_thr
-    (offspring_valid, offspring_invalid) = (offspring[idx_valid], offspring[~idx_valid])
-    (cond_valid, cond_invalid) = (cond[idx_valid], cond[~idx_valid])
+    return offspring, cond
 
-    # sort invalid scores (to eliminate the worst constraint violations)
-    idx_sort = np.argsort(cond_invalid)
-    offspring_invalid = offspring_invalid[idx_sort]
-    cond_invalid = cond_invalid[idx_sort]
 
-    # combine offsprings
-    offspring = np.concatenate((offspring_valid, offspring_invalid))
-    cond = np.concatenate((cond_valid, cond_invalid))
+def _get_valid_update(cond, cond_thr, cond_state, p_smooth):
+    """
+    Update the rolling validity rate of the generated offsprings (exponential moving average).
+    """
 
-    # keep the best offsprings
-    offspring = offspring[0:n_goal]
-    cond = cond[0:n_goal]
+    # fraction of valid offsprings in the batch
+    p_batch = np.count_nonzero(cond <= cond_thr)/len(cond)
 
-    return offspring, cond
+    # update the rolling validity rate
+    cond_state["p_valid"] = (1.0-p_smooth)*cond_state["p_valid"]+p_smooth*p_batch
+
+
+def _get_gen_batch(fct_gen, n_gen):
+    """
+    Apply an operator several times and merge the generated offsprings.
+    """
 
+    offspring = [fct_gen() for _ in range(n_gen)]
+    offspring = np.concatenate(offspring)
 
-def _get_retry(fct_gen, obj_eval, cond_iter):
+    return offspring
+
+
+def _get_retry(fct_gen, obj_eval, obj_cache, cond_iter, cond_state):
     """
     Apply an operator with constraints:
         - apply the operator and check the constraints
         - keep the valid individuals (rank by validity score)
         - iterate until a new population is obtained
+
+    The number of operator calls per iteration is adapted with the rolling validity rate.
     """
 
     # extract
     n_retry = cond_iter["n_retry"]
     frac_stop = cond_iter["frac_stop"]
     cond_thr = cond_iter["cond_thr"]
+    p_smooth = cond_iter["p_smooth"]
+    p_min = cond_iter["p_min"]
 
     # apply the operator
     offspring = fct_gen()
@@ -136,9 +242,12 @@ def _get_retry(fct_gen, obj_eval, cond_iter):
     n_goal = len(offspring)
 
     # compute validity scores
-    cond = obj_eval.eval_cond(offspring)
+    cond = obj_cache.eval_cond(offspring)
     obj_eval.set_cond(offspring, cond)
 
+    # update the validity rate
+    _get_valid_update(cond, cond_thr, cond_state, p_smooth)
+
     # iterate until the offsprings are good enough
     for _ in range(n_retry):
         # stop if enough offsprings are valid
@@ -146,13 +255,21 @@ def _get_retry(fct_gen, obj_eval, cond_iter):
         if (n_valid/n_goal) >= frac_stop:
             break
 
+        # number of operator calls for getting the missing valid offsprings (expected value)
+        p_valid = max(cond_state["p_valid"], p_min)
+        n_miss = frac_stop*n_goal-n_valid
+        n_gen = np.ceil(n_miss/(p_valid*n_goal)).astype(np.int64)
+
         # apply the operator
-        offspring_add = fct_gen()
+        offspring_add = _get_gen_batch(fct_gen, n_gen)
 
         # compute validity scores
-        cond_add = obj_eval.eval_cond(offspring_add)
+        cond_add = obj_cache.eval_cond(offspring_add)
         obj_eval.set_cond(offspring_add, cond_add)
 
+        # update the validity rate
+        _get_valid_update(cond_add, cond_thr, cond_state, p_smooth)
+
         # merge the new offsprings with the existing ones
         offspring = np.concatenate((offspring, offspring_add))
         cond = np.concatenate((cond, cond_add))
@@ -189,24 +306,39 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
     num_parents_mating = np.round(frac_parents_mating*len(x_init)).astype(np.int64)
     keep_elitism = np.round(frac_elitism*len(x_init)).astype(np.int64)
 
+    # cache for the constraint function (sized with respect to the population)
+    #   - a retry can generate up to ceil(frac_stop/p_min) batches of offsprings
+    #   - the cache should hold the retry batches and the selected survivors
+    n_batch = np.ceil(cond_iter["frac_stop"]/cond_iter["p_min"]).astype(np.int64)
+    obj_cache = _CondCache(obj_eval, max(10, 1+n_batch)*len(x_init))
+
+    # objective values of the evaluated individuals (replace the pygad solution history)
+    obj_hist = {}
+
+    # rolling validity rate of the offsprings (shared between the generations)
+    cond_state = {"p_valid": 1.0}
+
     # define variable types and bounds
     gene_space = []
     gene_type = []
     for i in range(n_var):
         if discrete[i]:
             gene_type.append(int)
-            gene_space.append(np.arange(lb[i], ub[i]+1))
+            if (ub[i]-lb[i]+1) <= _N_GENE_ARRAY:
+                gene_space.append(np.arange(lb[i], ub[i]+1))
+            else:
+                gene_space.append({'low': int(lb[i]), 'high': int(ub[i])+1, 'step': 1})
         else:
             gene_type.append([float, precision])
             gene_space.append({'low': lb[i], 'high': ub[i]})
 
     # objective function
     def fct_fitness(gad, x, idx):
-        return _get_fitness(gad, x, idx, obj_eval)
+        return _get_fitness(gad, x, idx, obj_eval, obj_hist)
 
     # callback function
     def fct_callback(gad):
-        return _get_callback(gad, obj_eval)
+        return _get_callback(gad, obj_eval, obj_cache)
 
     # create the genetic algorithm
     gad = pygad.GA(
@@ -227,7 +359,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
         fitness_func=fct_fitness,
         on_generation=fct_callback,
         # options
-        save_solutions=True,
+        save_solutions=False,
         suppress_warnings=True,
         parallel_processing=['thread', n_parallel],
     )
@@ -250,7 +382,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
             return offspring_tmp
 
         # iteration with the constraint function
-        offspring_ret = _get_retry(fct_gen, obj_eval, cond_iter)
+        offspring_ret = _get_retry(fct_gen, obj_eval, obj_cache, cond_iter, cond_state)
 
         return offspring_ret
 
@@ -261,7 +393,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
             return fct_mutation_op(offspring.copy())
 
         # iteration with the constraint function
-        offspring_ret = _get_retry(fct_gen, obj_eval, cond_iter)
+        offspring_ret = _get_retry(fct_gen, obj_eval, obj_cache, cond_iter, cond_state)
 
         return offspring_ret
 
@@ -272,7 +404,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
             return fct_crossover_op(parents.copy(), offspring_size)
 
         # iteration with the constraint function
-        offspring_ret = _get_retry(fct_gen, obj_eval, cond_iter)
+        offspring_ret = _get_retry(fct_gen, obj_eval, obj_cache, cond_iter, cond_state)
 
         return offspring_ret
 
@@ -300,3 +432,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_eval, n_parallel, parameters)
 
     # run the optimizer (with multi-threading)
     gad.run()
+
+    # release the cached objective values and constraints
+    obj_hist.clear()
+    obj_cache.clear()
@@ -41,8 +41,8 @@ def _get_fitness(x, obj_eval):
     Log the results.
     """
 
-    # convert to the diffevo format
-    x = x.transpose()
+    # convert to the diffevo format (row-major, contiguous rows for the per-design calls)
+    x = np.ascontiguousarray(x.transpose())
 
     # eval and log
     obj = obj_eval.eval_obj(x)
@@ -57,15 +57,15 @@ def _get_constraints(x, obj_eval):
     Log the results.
     """
 
-    # convert to the diffevo format
-    x = x.transpose()
+    # convert to the diffevo format (row-major, contiguous rows for the per-design calls)
+    x = np.ascontiguousarray(x.transpose())
 
     # eval and log
     cond = obj_eval.eval_cond(x)
     obj_eval.set_cond(x, cond)
 
-    # convert to the diffevo format
-    cond = np.expand_dims(cond, axis=0)
+    # convert to the diffevo format (view, no copy)
+    cond = cond.reshape(1, -1)
 
     return cond
 
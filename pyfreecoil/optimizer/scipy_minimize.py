@@ -21,7 +21,7 @@ class SolverConvergenceError(RuntimeError):
     pass
 
 
-def _get_expand(x, ref, discrete):
+def _get_expand(x, ref, idx_cont):
     """
     Expand an input by adding the discrete variables.
     """
@@ -30,7 +30,7 @@ def _get_expand(x, ref, discrete):
     xx = ref.copy()
 
     # replace optim variables
-    xx[np.logical_not(discrete)] = x
+    xx[idx_cont] = x
 
     return xx
 
@@ -88,8 +88,11 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_init, obj_eval, parameters):
     idx = np.argmin(obj_init)
     ref = x_init[idx]
 
+    # indices of the continuous variables
+    idx_cont = np.flatnonzero(np.logical_not(discrete))
+
     # remove discrete variables
-    x_init = ref[np.logical_not(discrete)]
+    x_init = ref[idx_cont]
 
     # define variable bounds for continuous variables
     if bounds:
@@ -102,7 +105,7 @@ def get_solve(n_var, lb, ub, discrete, x_init, obj_init, obj_eval, parameters):
 
     # fitness function
     def fct_fitness(x_tmp):
-        x_tmp = _get_expand(x_tmp, ref, discrete)
+        x_tmp = _get_expand(x_tmp, ref, idx_cont)
         obj_tmp = _get_fitness(x_tmp, obj_eval)
         _get_convergence(obj_eval)
         return obj_tmp
@@ -7,7 +7,9 @@ __author__ = "Thomas Guillod"
 __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
+import functools
 import numpy as np
+import shapely as sha
 import scipy.spatial as spa
 import scipy.signal as sig
 from pyfreecoil.solver import geometry_shape
@@ -31,22 +33,25 @@ def _get_angle(coord):
 
     # get segments
     segment = np.diff(coord, 1, 0)
-    segment_1 = segment[:-1]
-    segment_2 = segment[+1:]
+    dx = segment[:, 0]
+    dy = segment[:, 1]
 
-    # get angle
-    dot_1 = segment_1[:, 0]*segment_2[:, 1]-segment_1[:, 1]*segment_2[:, 0]
-    dot_2 = segment_1[:, 0]*segment_2[:, 0]+segment_1[:, 1]*segment_2[:, 1]
+    # get angle (cross and dot products between consecutive segments)
+    dot_1 = dx[:-1]*dy[+1:]-dy[:-1]*dx[+1:]
+    dot_2 = dx[:-1]*dx[+1:]+dy[:-1]*dy[+1:]
     angle = np.arctan2(dot_1, dot_2)
 
-    # get the sharp angle
-    angle = np.abs(np.pi-np.abs(angle))
+    # get the sharp angle (in-place, no temporary arrays)
+    np.abs(angle, out=angle)
+    np.subtract(np.pi, angle, out=angle)
+    np.abs(angle, out=angle)
 
-    # find singular angles
+    # find singular segments (computed once for all the segments)
     eps = np.finfo(1.0).eps
-    singular_1 = np.all(np.abs(segment_1) < eps, axis=1)
-    singular_2 = np.all(np.abs(segment_2) < eps, axis=1)
-    singular = np.logical_or(singular_1, singular_2)
+    singular = np.all(np.abs(segment) < eps, axis=1)
+
+    # find singular angles
+    singular = np.logical_or(singular[:-1], singular[+1:])
 
     # handle singular angles
     angle[singular] = np.pi
@@ -54,6 +59,18 @@ def _get_angle(coord):
     return angle
 
 
+@functools.lru_cache(maxsize=64)
+def _get_window(window_conv, conv):
+    """
+    Get a convolution window (cached, the window type is fixed for a run).
+    The returned array is shared and should not be modified.
+    """
+
+    window = sig.windows.get_window(window_conv, conv)
+
+    return window
+
+
 def _get_segment_resample(coord, width, size_min, dis_resample):
     """
     Resample a coordinate vector and a width vector.
@@ -75,57 +92,51 @@ def _get_segment_resample(coord, width, size_min, dis_resample):
     # resampled cumulative distance
     dis = np.linspace(0, length, n_segment)
 
+    # find the interpolation intervals (single search for the coordinate and width)
+    idx = np.searchsorted(dis_ref, dis, side="right")-1
+    idx = np.clip(idx, 0, len(dis_ref)-2)
+
+    # get the interpolation fractions (right value for zero-length segments)
+    dis_add = dis_ref[idx+1]-dis_ref[idx]
+    dis_sub = dis-dis_ref[idx]
+    frac = np.divide(dis_sub, dis_add, out=np.ones_like(dis), where=dis_add > 0)
+    frac = np.expand_dims(frac, axis=1)
+
     # interpolation of the coordinate and width
-    width = np.interp(dis, dis_ref, width)
-    x_pts = np.interp(dis, dis_ref, coord[:, 0])
-    y_pts = np.interp(dis, dis_ref, coord[:, 1])
-    coord = np.vstack((x_pts, y_pts)).transpose()
+    val = np.column_stack((coord, width))
+    val = val[idx]+frac*(val[idx+1]-val[idx])
+    coord = val[:, 0:2]
+    width = val[:, 2]
 
     return dis, coord, width
 
 
-def _check_trace_distance_seg_sub(geom, distance_options):
+def _check_trace_distance_seg_block(dis, coord, width, idx_row, tol_add, mag_fact):
     """
-    Compute the internal distance within a trace.
-    This is used to avoid "quasi-intersection" within a trace.
-
-    Resample the trace into many segments.
-    Compute the distance between all the points.
-    Ignore the distance of the points that are close to each others.
-    Return the minimum distance.
+    Compute the internal distance for a block of points.
+    The points of the block are compared with the following points.
     """
 
-    # extract
-    coord = geom["coord"]
-    width = geom["width"]
-
-    # extract
-    size_min = distance_options["size_min"]
-    dis_resample = distance_options["dis_resample"]
-    tol_angle = distance_options["tol_angle"]
-    tol_add = distance_options["tol_add"]
-
-    # resample the trace
-    (dis, coord, width) = _get_segment_resample(coord, width, size_min, dis_resample)
+    # get the following points
+    idx_col = slice(idx_row.start, len(dis))
 
     # compute the trace width
-    (mat_a, mat_b) = np.meshgrid(width, width)
-    mat_width = (mat_a+mat_b)/2
+    mat_width = (width[idx_row, None]+width[None, idx_col])/2
 
-    # compute distance between all the points
-    mat_pts = spa.distance.pdist(coord)
-    mat_pts = spa.distance.squareform(mat_pts)
+    # compute distance between the points
+    mat_pts = spa.distance.cdist(coord[idx_row], coord[idx_col])
 
     # compute distance along the path
-    dis = np.expand_dims(dis, axis=1)
-    mat_seg = spa.distance.pdist(dis)
-    mat_seg = spa.distance.squareform(mat_seg)
+    mat_seg = np.abs(dis[idx_row, None]-dis[None, idx_col])
 
     # detect the points that are quasi-adjacent
-    tol_angle = np.deg2rad(tol_angle)
-    mag_len = mat_width/np.sin(tol_angle/2)
+    mag_len = mat_width*mag_fact
     mat_check = mat_seg < (tol_add+mag_len)
 
+    # ignore the pairs that are already considered (lower triangle and diagonal)
+    (n_row, n_col) = mat_check.shape
+    mat_check |= np.tri(n_row, n_col, dtype=bool)
+
     # create the distance matrix
     mat_final = mat_pts-mat_width
 
@@ -133,49 +144,153 @@ def _check_trace_distance_seg_sub(geom, distance_options):
     mat_final[mat_check] = np.PINF
 
     # get the critical distance
-    distance = np.min(mat_final)
+    distance = np.min(mat_final, initial=np.PINF)
 
     return distance
 
 
-def _check_trace_distance_end_sub(geom):
+def _check_trace_distance_seg_tree(dis, coord, width, tol_add, mag_fact, n_block):
     """
-    Compute the distance between the start/end nodes of a trace.
+    Compute the internal distance with a KD-tree (close point pairs only).
+    The search radius is increased until the minimum distance is proven:
+        - the pairs outside the radius cannot be closer than the radius minus the width
+        - the search with the maximum radius is exhaustive (all the pairs)
+        - return None if the search is not conclusive (too many pairs)
     """
 
-    # extract
-    coord = geom["coord"]
-    width = geom["width"]
+    # get the radius bounds (small margin for the exhaustive search)
+    width_max = np.max(width)
+    radius_max = (1.0+1e-6)*np.hypot(*np.ptp(coord, axis=0))
+    radius = 2*width_max
+
+    # without width, the exhaustive search is done directly
+    if radius <= 0:
+        radius = radius_max
+
+    # create the tree
+    tree = spa.cKDTree(coord)
+
+    # increase the search radius
+    while True:
+        # limit the search radius
+        radius = min(radius, radius_max)
+
+        # get the close point pairs
+        pairs = tree.query_pairs(radius, output_type="ndarray")
+        if len(pairs) > n_block*len(dis):
+            return None
+        idx_a = pairs[:, 0]
+        idx_b = pairs[:, 1]
+
+        # compute the trace width
+        mat_width = (width[idx_a]+width[idx_b])/2
+
+        # compute distance between the points
+        mat_pts = np.hypot(*(coord[idx_a]-coord[idx_b]).transpose())
+
+        # compute distance along the path
+        mat_seg = np.abs(dis[idx_a]-dis[idx_b])
+
+        # detect the points that are quasi-adjacent
+        mag_len = mat_width*mag_fact
+        mat_check = mat_seg < (tol_add+mag_len)
+
+        # create the distance vector
+        mat_final = mat_pts-mat_width
+
+        # ignore the distance of the points that are quasi-adjacent
+        mat_final[mat_check] = np.PINF
+
+        # get the critical distance (if proven or if the search is exhaustive)
+        distance = np.min(mat_final, initial=np.PINF)
+        if (distance <= (radius-width_max)) or (radius >= radius_max):
+            return distance
+
+        # increase the search radius
+        radius = 2*radius
+
+
+def _check_trace_distance_seg_sub(resample, tol_add, mag_fact, n_block):
+    """
+    Compute the internal distance within a trace.
+    This is used to avoid "quasi-intersection" within a trace.
+
+    Use the resampled trace (many segments).
+    Compute the distance between all the points.
+    Ignore the distance of the points that are close to each others.
+    Return the minimum distance.
+
+    The distances are computed with a KD-tree (close point pairs only).
+    Otherwise, by blocks of points (bounded memory for long traces).
+    """
+
+    # extract the resampled trace
+    (dis, coord, width) = resample
+
+    # get the critical distance with a KD-tree (if conclusive)
+    distance = _check_trace_distance_seg_tree(dis, coord, width, tol_add, mag_fact, n_block)
+    if distance is not None:
+        return distance
+
+    # init the critical distance
+    distance = np.PINF
+
+    # get the critical distance for the blocks
+    for idx in range(0, len(dis), n_block):
+        idx_row = slice(idx, min(idx+n_block, len(dis)))
+        distance_tmp = _check_trace_distance_seg_block(dis, coord, width, idx_row, tol_add, mag_fact)
+        distance = np.minimum(distance, distance_tmp)
+
+    return distance
+
+
+def _check_trace_distance_end(geom_trace):
+    """
+    Compute the distance between the start/end nodes of the traces.
+    The distances are computed for all the traces at once.
+    """
+
+    # if empty, no distances
+    if len(geom_trace) == 0:
+        return np.empty(0, dtype=np.float64)
 
     # start and end node
-    coord = coord[+0]-coord[-1]
-    width = (width[+0]+width[-1])/2
+    coord = np.array([geom_tmp["coord"][+0]-geom_tmp["coord"][-1] for geom_tmp in geom_trace], dtype=np.float64)
+    width = np.array([geom_tmp["width"][+0]+geom_tmp["width"][-1] for geom_tmp in geom_trace], dtype=np.float64)
+    width = width/2
 
     # node distance
-    distance = np.hypot(coord[0], coord[1])-width
+    distance = np.hypot(coord[:, 0], coord[:, 1])-width
 
     return distance
 
 
-def _check_trace_distance(geom_trace, distance_options):
+def _check_trace_distance(geom_trace, resample_list, distance_options):
     """
     Compute the clearance within a trace:
         - Compute the internal distance (detect quasi-intersection)
         - Compute the distance between the start/end nodes
     """
 
+    # extract
+    tol_angle = distance_options["tol_angle"]
+    tol_add = distance_options["tol_add"]
+    n_block = distance_options["n_block"]
+
+    # scaling factor for the quasi-adjacent points (computed once for all the traces)
+    tol_angle = np.deg2rad(tol_angle)
+    mag_fact = 1/np.sin(tol_angle/2)
+
     # init
-    distance = np.empty(0, dtype=np.float64)
+    n_trace = len(geom_trace)
+    distance = np.empty(2*n_trace, dtype=np.float64)
 
     # get internal clearance
-    for geom_tmp in geom_trace:
-        distance_tmp = _check_trace_distance_seg_sub(geom_tmp, distance_options)
-        distance = np.append(distance, distance_tmp)
+    for idx, resample_tmp in enumerate(resample_list):
+        distance[idx] = _check_trace_distance_seg_sub(resample_tmp, tol_add, mag_fact, n_block)
 
     # get the start/end clearance
-    for geom_tmp in geom_trace:
-        distance_tmp = _check_trace_distance_end_sub(geom_tmp)
-        distance = np.append(distance, distance_tmp)
+    distance[n_trace:] = _check_trace_distance_end(geom_trace)
 
     return distance
 
@@ -185,39 +300,27 @@ def _check_clearance_sub(geom_all, idx):
     Compute the clearance between different shapes for a given layer.
     """
 
-    # init a vector with all the shapes
-    obj_list = []
-
     # assemble a vector with all the shapes
-    for geom_tmp in geom_all:
-        # extract
-        layer = geom_tmp["layer"]
-        obj = geom_tmp["obj"]
+    obj_all = np.array([geom_tmp["obj"] for geom_tmp in geom_all], dtype=object)
 
-        # if invalid, clearance is negative infinity
-        if not obj.is_valid:
-            return np.NINF
+    # if invalid, clearance is negative infinity (vectorized check)
+    if not np.all(sha.is_valid(obj_all)):
+        return np.NINF
 
-        # append if the layer is matching
-        if idx in layer:
-            obj_list.append(obj)
+    # keep the shapes with a matching layer
+    idx_layer = [idx in geom_tmp["layer"] for geom_tmp in geom_all]
+    obj_list = obj_all[np.array(idx_layer, dtype=bool)]
 
     # if empty, clearance is positive infinity
     if len(obj_list) == 0:
         return np.PINF
 
-    # init a matrix with the clearance between the shapes
-    clearance_list = np.zeros((len(obj_list), len(obj_list)), dtype=np.float64)
-
-    # compute the clearance distance matrix
-    for idx, obj in enumerate(obj_list):
-        clearance_list[idx] = obj.distance(obj_list)
-
-    # remove the diagonal (self-clearance)
-    np.fill_diagonal(clearance_list, np.PINF)
+    # get the shape pairs (upper triangle, the distance is symmetric)
+    (idx_a, idx_b) = np.triu_indices(len(obj_list), k=1)
 
-    # get the minimum clearance
-    clearance = np.min(clearance_list)
+    # get the minimum clearance (vectorized, positive infinity for a single shape)
+    clearance = sha.distance(obj_list[idx_a], obj_list[idx_b])
+    clearance = np.min(clearance, initial=np.PINF)
 
     return clearance
 
@@ -228,44 +331,20 @@ def _check_clearance(geom_shape, geom_terminal, position):
     """
 
     # init
-    clearance = np.empty(0, dtype=np.float64)
+    clearance = np.empty(2*len(position), dtype=np.float64)
 
     # get clearance for each layer
     for idx in range(len(position)):
         # compute the clearance between the shapes
-        clearance_tmp = _check_clearance_sub(geom_shape, idx)
-        clearance = np.append(clearance, clearance_tmp)
+        clearance[2*idx+0] = _check_clearance_sub(geom_shape, idx)
 
         # compute the clearance between the terminals
-        clearance_tmp = _check_clearance_sub(geom_terminal, idx)
-        clearance = np.append(clearance, clearance_tmp)
+        clearance[2*idx+1] = _check_clearance_sub(geom_terminal, idx)
 
     return clearance
 
 
-def _check_trace_base_sub(geom):
-    """
-    Compute basic properties of a trace:
-        - Angles between the segments
-        - Lengths of the segments
-        - Widths of the trace
-    """
-
-    # extract
-    coord = geom["coord"]
-    width = geom["width"]
-
-    # angle
-    angle = _get_angle(coord)
-
-    # get length
-    segment = _get_segment(coord)
-    length = np.sum(segment)
-
-    return angle, length, width
-
-
-def _check_trace_resample_sub(geom, average_options):
+def _check_trace_resample_sub(resample, average_options):
     """
     Compute advanced properties of a trace:
         - Compute the "locally averaged curvature rate"
@@ -273,18 +352,12 @@ def _check_trace_resample_sub(geom, average_options):
     """
 
     # extract
-    coord = geom["coord"]
-    width = geom["width"]
-
-    # extract
-    size_min = average_options["size_min"]
     window_conv = average_options["window_conv"]
     length_min = average_options["length_min"]
-    dis_resample = average_options["dis_resample"]
     dis_average = average_options["dis_average"]
 
-    # resample the trace
-    (dis, coord, width) = _get_segment_resample(coord, width, size_min, dis_resample)
+    # extract the resampled trace
+    (dis, coord, width) = resample
 
     # short trace are valid as local parameters cannot be computed
     if np.max(dis) < length_min:
@@ -303,14 +376,14 @@ def _check_trace_resample_sub(geom, average_options):
     radius = np.abs(np.pi-radius)
 
     # local average for the width gradient
-    conv = np.minimum(repeat, len(diff))
-    window = sig.windows.get_window(window_conv, conv)
+    conv = int(np.minimum(repeat, len(diff)))
+    window = _get_window(window_conv, conv)
     diff = np.convolve(diff, window, mode="valid")
     diff = np.max(diff)
 
     # local average for the curvature rate
-    conv = np.minimum(repeat, len(radius))
-    window = sig.windows.get_window(window_conv, conv)
+    conv = int(np.minimum(repeat, len(radius)))
+    window = _get_window(window_conv, conv)
     radius = np.convolve(radius, window, mode="valid")
     radius = np.max(radius)
 
@@ -320,81 +393,139 @@ def _check_trace_resample_sub(geom, average_options):
 def _check_trace_base(geom_trace):
     """
     Compute basic properties for all the traces:
+        - Angles between the segments
+        - Lengths of the traces
+        - Widths of the traces
+
+    The traces are merged into flat arrays (vectorized over all the traces).
+    The segments and angles spanning several traces are discarded.
     """
 
-    # init
-    angle = np.empty(0, dtype=np.float64)
-    length = np.empty(0, dtype=np.float64)
-    width = np.empty(0, dtype=np.float64)
+    # if empty, no properties
+    if len(geom_trace) == 0:
+        angle = np.empty(0, dtype=np.float64)
+        length = np.empty(0, dtype=np.float64)
+        width = np.empty(0, dtype=np.float64)
+        return angle, length, width
 
-    # get the properties
-    for geom_tmp in geom_trace:
-        (angle_tmp, length_tmp, width_tmp) = _check_trace_base_sub(geom_tmp)
-        angle = np.append(angle, angle_tmp)
-        length = np.append(length, length_tmp)
-        width = np.append(width, width_tmp)
+    # merge the traces
+    coord = np.concatenate([geom_tmp["coord"] for geom_tmp in geom_trace], dtype=np.float64)
+    width = np.concatenate([geom_tmp["width"] for geom_tmp in geom_trace], dtype=np.float64)
+
+    # get the trace indices of the points
+    n_pts = [len(geom_tmp["coord"]) for geom_tmp in geom_trace]
+    idx_trace = np.repeat(np.arange(len(geom_trace)), n_pts)
+
+    # angle (keep the angles within a trace)
+    angle = _get_angle(coord)
+    angle = angle[idx_trace[:-2] == idx_trace[+2:]]
+
+    # get length (sum of the segments within a trace)
+    segment = _get_segment(coord)
+    idx_valid = idx_trace[:-1] == idx_trace[+1:]
+    length = np.bincount(idx_trace[:-1][idx_valid], segment[idx_valid], len(geom_trace))
 
     return angle, length, width
 
 
-def _check_trace_resample(geom_trace, average_options):
+def _get_trace_resample(geom_trace, resample_options):
+    """
+    Resample all the traces.
+    """
+
+    # extract
+    size_min = resample_options["size_min"]
+    dis_resample = resample_options["dis_resample"]
+
+    # resample the traces
+    resample_list = []
+    for geom_tmp in geom_trace:
+        resample_tmp = _get_segment_resample(geom_tmp["coord"], geom_tmp["width"], size_min, dis_resample)
+        resample_list.append(resample_tmp)
+
+    return resample_list
+
+
+def _get_resample_match(resample_options_a, resample_options_b):
+    """
+    Check if two resampling options are producing the same resampled traces.
+    """
+
+    # check the resampling parameters
+    match_size = resample_options_a["size_min"] == resample_options_b["size_min"]
+    match_dis = resample_options_a["dis_resample"] == resample_options_b["dis_resample"]
+
+    return match_size and match_dis
+
+
+def _check_trace_resample(resample_list, average_options):
     """
     Compute advanced properties for all the traces:
     """
 
     # init
-    diff = np.empty(0, dtype=np.float64)
-    radius = np.empty(0, dtype=np.float64)
+    diff = np.empty(len(resample_list), dtype=np.float64)
+    radius = np.empty(len(resample_list), dtype=np.float64)
 
     # get the properties
-    for geom_tmp in geom_trace:
-        (diff_tmp, radius_tmp) = _check_trace_resample_sub(geom_tmp, average_options)
-        diff = np.append(diff, diff_tmp)
-        radius = np.append(radius, radius_tmp)
+    for idx, resample_tmp in enumerate(resample_list):
+        (diff[idx], radius[idx]) = _check_trace_resample_sub(resample_tmp, average_options)
 
     return diff, radius
 
 
-def _check_box(geom_all, outline, keepout, simplify, construct):
+@functools.lru_cache(maxsize=8)
+def _get_outline(outline, keepout):
     """
-    Compute the distance between the shapes and the outline.
+    Get a polygon mask from the outline (cached, the outline is fixed for a run).
+    The polygon is prepared (faster containment checks).
+    The outline and keepout coordinates are provided as (hashable) tuples.
     """
 
-    # init a vector with all the shapes
-    obj_list = []
+    # get a polygon mask from the outline
+    obj = geometry_shape.get_polygon(outline, keepout)
+    sha.prepare(obj)
 
-    # assemble a vector with all the shapes
-    for geom_tmp in geom_all:
-        # extract
-        obj = geom_tmp["mask"]
+    # get the boundary of the polygon
+    boundary = obj.boundary
 
-        # if invalid, clearance is positive infinity
-        if not obj.is_valid:
-            return np.PINF
+    return obj, boundary
 
-        # append the shape
-        obj_list.append(obj)
+
+def _check_box(geom_all, outline, keepout, simplify, construct, divide):
+    """
+    Compute the distance between the shapes and the outline.
+    """
+
+    # assemble a vector with all the shapes
+    obj_list = [geom_tmp["mask"] for geom_tmp in geom_all]
+
+    # if invalid, clearance is positive infinity (vectorized check)
+    if not np.all(sha.is_valid(obj_list)):
+        return np.PINF
 
     # if empty, clearance is negative infinity
     if len(obj_list) == 0:
         return np.NINF
 
     # merge and simplify the shapes
-    obj = geometry_shape.get_union(obj_list, construct)
+    obj = geometry_shape.get_union(obj_list, construct, divide)
     obj = geometry_shape.get_simplify(obj, simplify)
 
-    # get a polygon mask from the outline
-    outline = geometry_shape.get_polygon(outline, keepout)
+    # get a polygon mask from the outline (cached)
+    outline = tuple(map(tuple, outline))
+    keepout = tuple(tuple(map(tuple, keepout_tmp)) for keepout_tmp in keepout)
+    (outline, outline_boundary) = _get_outline(outline, keepout)
 
     # check the distance between the shapes and the outline
     if outline.contains(obj):
         # if the shapes are inside the outline, return the distance (negative sign)
-        boundary = obj.distance(outline.boundary)
+        boundary = obj.distance(outline_boundary)
         boundary = np.negative(boundary)
     else:
         # if the shapes are outside the outline, return the overlap (positive sign)
-        obj_tmp = geometry_shape.get_difference(obj, outline, construct)
-        obj_tmp = geometry_shape.get_simplify(obj_tmp, simplify)
+        #   - the area is computed without simplification (no additional GEOS pass)
+        obj_tmp = geometry_shape.get_difference(obj, outline, construct, divide)
         boundary = np.sqrt(obj_tmp.area)
 
     return boundary
@@ -413,16 +544,15 @@ def _check_bnd_range(valid_clamp, val, limit):
     # get the limits
     (v_min, v_max) = limit
 
-    # get all the values as a flat array
-    val = np.array([val], dtype=np.float64)
-    val = val.flatten()
+    # get all the values as a flat array (no copy for float arrays)
+    val = np.asarray(val, dtype=np.float64).ravel()
 
     # init with valid values (negative infinity)
     rel_min = np.NINF
     rel_max = np.NINF
 
     # compute the relative error with the bounds
-    if len(val) > 0:
+    if val.size > 0:
         if v_min is not None:
             rel_min = (v_min-np.min(val))/v_min
         if v_max is not None:
@@ -475,10 +605,12 @@ def run_check(data_vector, shapely, design_rule):
     valid_clamp = design_rule["valid_clamp"]
     average_options = design_rule["average_options"]
     distance_options = design_rule["distance_options"]
+    early_reject = design_rule["early_reject"]
 
     # extract
     simplify = shapely["simplify"]
     construct = shapely["construct"]
+    divide = shapely["divide"]
 
     # extract
     position = data_vector["position"]
@@ -495,29 +627,42 @@ def run_check(data_vector, shapely, design_rule):
     geom_all = geom_shape+geom_terminal
 
     # compute the distance between the shapes and the
-    boundary = _check_box(geom_all, outline, keepout, simplify, construct)
+    boundary = _check_box(geom_all, outline, keepout, simplify, construct, divide)
+    valid_boundary = _check_bnd_single(valid_clamp, boundary, limit_val["boundary"])
 
     # compute the clearance between different shapes for all the layers
     clearance = _check_clearance(geom_shape, geom_terminal, position)
+    valid_clearance = _check_bnd_range(valid_clamp, clearance, limit_val["clearance"])
 
-    # compute the parameters of the different traces
+    # compute the basic parameters of the different traces
     (angle, length, width) = _check_trace_base(geom_trace)
-    (diff, radius) = _check_trace_resample(geom_trace, average_options)
-    distance = _check_trace_distance(geom_trace, distance_options)
-
-    # cast angles to degree
     angle = np.rad2deg(angle)
-    radius = np.rad2deg(radius)
-
-    # compute the scaled validity parameters
-    valid_boundary = _check_bnd_single(valid_clamp, boundary, limit_val["boundary"])
-    valid_clearance = _check_bnd_range(valid_clamp, clearance, limit_val["clearance"])
     valid_length = _check_bnd_range(valid_clamp, length, limit_val["length"])
-    valid_distance = _check_bnd_range(valid_clamp, distance, limit_val["distance"])
     valid_width = _check_bnd_range(valid_clamp, width, limit_val["width"])
     valid_angle = _check_bnd_range(valid_clamp, angle, limit_val["angle"])
-    valid_diff = _check_bnd_range(valid_clamp, diff, limit_val["diff"])
-    valid_radius = _check_bnd_range(valid_clamp, radius, limit_val["radius"])
+
+    # compute the advanced parameters of the different traces
+    #   - if enabled, the expensive checks are skipped if the boundary check is saturated
+    #   - the skipped checks are set to the worst case (upper clamping bound)
+    if early_reject and (valid_boundary >= valid_clamp["bnd_max"]):
+        valid_distance = valid_clamp["bnd_max"]
+        valid_diff = valid_clamp["bnd_max"]
+        valid_radius = valid_clamp["bnd_max"]
+    else:
+        # resample the traces (shared between the checks if the resampling options are the same)
+        resample_distance = _get_trace_resample(geom_trace, distance_options)
+        if _get_resample_match(distance_options, average_options):
+            resample_average = resample_distance
+        else:
+            resample_average = _get_trace_resample(geom_trace, average_options)
+
+        # compute the parameters
+        (diff, radius) = _check_trace_resample(resample_average, average_options)
+        distance = _check_trace_distance(geom_trace, resample_distance, distance_options)
+        radius = np.rad2deg(radius)
+        valid_distance = _check_bnd_range(valid_clamp, distance, limit_val["distance"])
+        valid_diff = _check_bnd_range(valid_clamp, diff, limit_val["diff"])
+        valid_radius = _check_bnd_range(valid_clamp, radius, limit_val["radius"])
 
     # assign
     data_valid = {
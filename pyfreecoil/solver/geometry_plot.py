@@ -19,11 +19,16 @@ warnings.filterwarnings("ignore", module="shapely")
 warnings.filterwarnings("ignore", module="numpy")
 
 
-def _extract_geom(data_vector):
+def get_shared(data_vector, param_shared):
     """
     Extract the different shapes composing a design.
+    Prepare the data shared between the plots (extracted shapes and scaled outline).
     """
 
+    # extract
+    scl_shape = param_shared["scl_shape"]
+    color_outline = param_shared["color_outline"]
+
     # extract data
     geom_via = data_vector["geom_via"]
     geom_trace = data_vector["geom_trace"]
@@ -32,13 +37,24 @@ def _extract_geom(data_vector):
     outline = data_vector["outline"]
     keepout = data_vector["keepout"]
 
-    # outline to polygon
+    # outline to polygon (scaled once for all the plots)
     outline = sha.Polygon(outline, holes=keepout)
+    outline = sht.scale(outline, scl_shape, scl_shape, scl_shape, origin=(0.0, 0.0, 0.0))
 
     # merge src and sink
     geom_terminal = [geom_src, geom_sink]
 
-    return outline, geom_via, geom_trace, geom_terminal
+    # assign the shared data
+    data_shared = {
+        "scl_shape": scl_shape,
+        "color_outline": color_outline,
+        "outline": outline,
+        "geom_via": geom_via,
+        "geom_trace": geom_trace,
+        "geom_terminal": geom_terminal,
+    }
+
+    return data_shared
 
 
 def _merge_material(geom_via, geom_trace, geom_terminal):
@@ -77,11 +93,24 @@ def _merge_mask(geom_via, geom_trace, geom_terminal):
     return obj, mask
 
 
+def _get_select(select):
+    """
+    Get the selected layers as a set of tuples.
+    """
+
+    select = {tuple(np.ravel(select_tmp)) for select_tmp in select}
+
+    return select
+
+
 def _merge_trace(geom_trace, select):
     """
     Merge all the traces for a given layer.
     """
 
+    # get the selected layers (hashable, constant time lookup)
+    select = _get_select(select)
+
     # init list containing the traces
     coord_list = []
 
@@ -89,9 +118,8 @@ def _merge_trace(geom_trace, select):
     for geom_tmp in geom_trace:
         coord = geom_tmp["coord"]
         layer = geom_tmp["layer"]
-        for select_tmp in select:
-            if np.array_equal(layer, select_tmp):
-                coord_list.append(coord)
+        if tuple(layer) in select:
+            coord_list.append(coord)
 
     # assemble the data
     obj = sha.MultiLineString(coord_list)
@@ -107,6 +135,9 @@ def _merge_layer(geom_via, geom_trace, geom_terminal, select):
     # combine shapes
     geom_all = geom_via+geom_trace+geom_terminal
 
+    # get the selected layers (hashable, constant time lookup)
+    select = _get_select(select)
+
     # init list containing the shapes
     obj_list = []
 
@@ -114,9 +145,8 @@ def _merge_layer(geom_via, geom_trace, geom_terminal, select):
     for geom_tmp in geom_all:
         obj = geom_tmp["obj"]
         layer = geom_tmp["layer"]
-        for select_tmp in select:
-            if np.array_equal(layer, select_tmp):
-                obj_list.append(obj)
+        if tuple(layer) in select:
+            obj_list.append(obj)
 
     # assemble the data
     obj = sha.unary_union(obj_list)
@@ -159,7 +189,27 @@ def _plot_line(obj, scl_shape, param):
         )
 
 
-def run_shape(data_vector, param_shared, data_shaper):
+def _plot_figure(data_shared, title, fct_plot):
+    """
+    Plot a figure with the outline (the other shapes are plotted with the provided function).
+    """
+
+    # extract
+    color_outline = data_shared["color_outline"]
+    outline = data_shared["outline"]
+
+    # plot figure (the outline is already scaled)
+    plt.figure()
+    _plot_polygon(outline, 1.0, color_outline)
+    fct_plot()
+    plt.grid(False)
+    plt.axis("equal")
+    plt.title(title)
+    plt.tight_layout()
+    plt.axis("off")
+
+
+def run_shape(data_shared, data_shaper):
     """
     Plot the geometry outline, the different shapes, and layers.
     """
@@ -170,30 +220,25 @@ def run_shape(data_vector, param_shared, data_shaper):
     line_color = data_shaper["line_color"]
 
     # extract
-    scl_shape = param_shared["scl_shape"]
-    color_outline = param_shared["color_outline"]
-
-    # merge geometries
-    (outline, geom_via, geom_trace, geom_terminal) = _extract_geom(data_vector)
+    scl_shape = data_shared["scl_shape"]
+    geom_via = data_shared["geom_via"]
+    geom_trace = data_shared["geom_trace"]
+    geom_terminal = data_shared["geom_terminal"]
+
+    # plot the shapes and the lines
+    def fct_plot():
+        for name, select in layer_def.items():
+            obj = _merge_layer(geom_via, geom_trace, geom_terminal, select)
+            _plot_polygon(obj, scl_shape, shape_color[name])
+        for name, select in layer_def.items():
+            obj = _merge_trace(geom_trace, select)
+            _plot_line(obj, scl_shape, line_color[name])
 
     # plot figure
-    plt.figure()
-    _plot_polygon(outline, scl_shape, color_outline)
-    for name, select in layer_def.items():
-        obj = _merge_layer(geom_via, geom_trace, geom_terminal, select)
-        _plot_polygon(obj, scl_shape, shape_color[name])
-    for name, select in layer_def.items():
-        obj = _merge_trace(geom_trace, select)
-        _plot_line(obj, scl_shape, line_color[name])
-
-    plt.grid(False)
-    plt.axis("equal")
-    plt.title("Outline and Shapes")
-    plt.tight_layout()
-    plt.axis("off")
+    _plot_figure(data_shared, "Outline and Shapes", fct_plot)
 
 
-def run_mask(data_vector, param_shared, param_mask):
+def run_mask(data_shared, param_mask):
     """
     Plot the geometry outline, the shapes, and the masks.
     """
@@ -203,26 +248,24 @@ def run_mask(data_vector, param_shared, param_mask):
     color_mask = param_mask["color_mask"]
 
     # extract
-    scl_shape = param_shared["scl_shape"]
-    color_outline = param_shared["color_outline"]
+    scl_shape = data_shared["scl_shape"]
+    geom_via = data_shared["geom_via"]
+    geom_trace = data_shared["geom_trace"]
+    geom_terminal = data_shared["geom_terminal"]
 
     # merge geometries
-    (outline, geom_via, geom_trace, geom_terminal) = _extract_geom(data_vector)
     (obj, mask) = _merge_mask(geom_via, geom_trace, geom_terminal)
 
+    # plot the shapes and the masks
+    def fct_plot():
+        _plot_polygon(obj, scl_shape, color_obj)
+        _plot_polygon(mask, scl_shape, color_mask)
+
     # plot figure
-    plt.figure()
-    _plot_polygon(outline, scl_shape, color_outline)
-    _plot_polygon(obj, scl_shape, color_obj)
-    _plot_polygon(mask, scl_shape, color_mask)
-    plt.grid(False)
-    plt.axis("equal")
-    plt.title("Outline, Shapes, Masks")
-    plt.tight_layout()
-    plt.axis("off")
+    _plot_figure(data_shared, "Outline, Shapes, Masks", fct_plot)
 
 
-def run_terminal(data_vector, param_shared, param_material):
+def run_terminal(data_shared, param_material):
     """
     Plot the geometry outline, the conductors, and the terminals.
     """
@@ -232,20 +275,18 @@ def run_terminal(data_vector, param_shared, param_material):
     color_terminal = param_material["color_terminal"]
 
     # extract
-    scl_shape = param_shared["scl_shape"]
-    color_outline = param_shared["color_outline"]
+    scl_shape = data_shared["scl_shape"]
+    geom_via = data_shared["geom_via"]
+    geom_trace = data_shared["geom_trace"]
+    geom_terminal = data_shared["geom_terminal"]
 
     # merge geometries
-    (outline, geom_via, geom_trace, geom_terminal) = _extract_geom(data_vector)
     (conductor, terminal) = _merge_material(geom_via, geom_trace, geom_terminal)
 
+    # plot the conductors and the terminals
+    def fct_plot():
+        _plot_polygon(conductor, scl_shape, color_conductor)
+        _plot_polygon(terminal, scl_shape, color_terminal)
+
     # plot figure
-    plt.figure()
-    _plot_polygon(outline, scl_shape, color_outline)
-    _plot_polygon(conductor, scl_shape, color_conductor)
-    _plot_polygon(terminal, scl_shape, color_terminal)
-    plt.grid(False)
-    plt.axis("equal")
-    plt.title("Outline, Conductors, and Terminals")
-    plt.tight_layout()
-    plt.axis("off")
+    _plot_figure(data_shared, "Outline, Conductors, and Terminals", fct_plot)
@@ -7,6 +7,7 @@ __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
 import warnings
+import functools
 import numpy as np
 import shapely as sha
 
@@ -48,17 +49,20 @@ def _get_clean_shape(obj):
     return obj
 
 
-def get_trace(coord_1, coord_2, width_1, width_2):
+def get_trace(coord, width):
     """
-    Create a trace with variable width.
-    The trace is smooth when terminated with round pads.
+    Create traces with variable width between consecutive points.
+    The traces are smooth when terminated with round pads.
+    The polygons are computed for all the segments at once (vectorized).
     """
 
     # get points
-    (x_1, y_1) = coord_1
-    (x_2, y_2) = coord_2
-    r_1 = width_1/2
-    r_2 = width_2/2
+    x_1 = coord[:-1, 0]
+    y_1 = coord[:-1, 1]
+    x_2 = coord[+1:, 0]
+    y_2 = coord[+1:, 1]
+    r_1 = width[:-1]/2
+    r_2 = width[+1:]/2
 
     # get direction vector
     d_x = x_2-x_1
@@ -70,8 +74,8 @@ def get_trace(coord_1, coord_2, width_1, width_2):
     # check if the tangent exists
     valid = dis > np.abs(r_2 - r_1)
 
-    # check if the tangent exists
-    if valid:
+    # normalize vector and get the angles (the invalid segments are discarded afterward)
+    with np.errstate(divide="ignore", invalid="ignore"):
         # normalize vector
         d_x = d_x/dis
         d_y = d_y/dis
@@ -80,22 +84,26 @@ def get_trace(coord_1, coord_2, width_1, width_2):
         angle_1 = np.arctan2(d_y, d_x)
         angle_2 = np.arccos((r_1-r_2)/dis)
 
-        # assemble the polygon coordinates
-        coord = np.array([
-            [x_1-d_x*r_1, y_1-d_y*r_1],
-            [x_1+r_1*np.cos(angle_1+angle_2), y_1+r_1*np.sin(angle_1+angle_2)],
-            [x_2+r_2*np.cos(angle_1+angle_2), y_2+r_2*np.sin(angle_1+angle_2)],
-            [x_2+d_x*r_2, y_2+d_y*r_2],
-            [x_2+r_2*np.cos(angle_1-angle_2), y_2+r_2*np.sin(angle_1-angle_2)],
-            [x_1+r_1*np.cos(angle_1-angle_2), y_1+r_1*np.sin(angle_1-angle_2)],
-        ], dtype=np.float64)
-    else:
-        coord = None
+    # assemble the polygon coordinates
+    coord = np.stack([
+        np.stack([x_1-d_x*r_1, y_1-d_y*r_1], axis=1),
+        np.stack([x_1+r_1*np.cos(angle_1+angle_2), y_1+r_1*np.sin(angle_1+angle_2)], axis=1),
+        np.stack([x_2+r_2*np.cos(angle_1+angle_2), y_2+r_2*np.sin(angle_1+angle_2)], axis=1),
+        np.stack([x_2+d_x*r_2, y_2+d_y*r_2], axis=1),
+        np.stack([x_2+r_2*np.cos(angle_1-angle_2), y_2+r_2*np.sin(angle_1-angle_2)], axis=1),
+        np.stack([x_1+r_1*np.cos(angle_1-angle_2), y_1+r_1*np.sin(angle_1-angle_2)], axis=1),
+    ], axis=1, dtype=np.float64)
 
     # assemble
-    shape = {"geom": "trace", "data": coord, "valid": valid}
+    shape_list = []
+    for coord_tmp, valid_tmp in zip(coord, valid):
+        if valid_tmp:
+            shape = {"geom": "trace", "data": coord_tmp, "valid": valid_tmp}
+        else:
+            shape = {"geom": "trace", "data": None, "valid": valid_tmp}
+        shape_list.append(shape)
 
-    return shape
+    return shape_list
 
 
 def get_pad(coord, diameter):
@@ -112,42 +120,117 @@ def get_pad(coord, diameter):
     return shape
 
 
+def get_pad_list(coord, diameter):
+    """
+    Create round pads for several points.
+    The validity is computed for all the points at once.
+    """
+
+    # get the validity
+    valid = diameter > 0.0
+
+    # assemble
+    shape_list = []
+    for coord_tmp, diameter_tmp, valid_tmp in zip(coord, diameter, valid):
+        shape = {"geom": "pad", "data": (coord_tmp, diameter_tmp), "valid": valid_tmp}
+        shape_list.append(shape)
+
+    return shape_list
+
+
+@functools.lru_cache(maxsize=1024)
+def _get_pad_proto(diameter):
+    """
+    Get the coordinates of a round pad centered at the origin.
+    The prototypes are cached (the pads have only a few different diameters).
+    """
+
+    # create the pad
+    obj = sha.Point(0.0, 0.0).buffer(diameter/2, quad_segs=16)
+    coord = sha.get_coordinates(obj)
+
+    # the cached array should not be modified
+    coord.flags.writeable = False
+
+    return coord
+
+
+def _get_pad_polygon(coord, diameter):
+    """
+    Create round pads from translated prototypes (vectorized).
+    The diameters are rounded (nanometer) in order to reuse the prototypes.
+    """
+
+    # get the different diameters
+    diameter = np.round(diameter, 9)
+    (diameter, idx) = np.unique(diameter, return_inverse=True)
+
+    # get the prototypes
+    proto = np.array([_get_pad_proto(diameter_tmp) for diameter_tmp in diameter])
+
+    # translate the prototypes
+    coord = proto[idx]+coord[:, np.newaxis, :]
+    obj = sha.polygons(coord)
+
+    return obj
+
+
 def get_shape(shape_list):
     """
     Transform shapes into Shapely objects.
+    The objects are constructed with vectorized calls (grouped by shape type).
     """
 
-    # list for the shape object
-    obj_list = []
+    # keep the valid shapes
+    shape_list = [shape for shape in shape_list if shape["valid"]]
 
-    # create the object
-    for shape in shape_list:
-        # extract
-        geom = shape["geom"]
-        data = shape["data"]
-        valid = shape["valid"]
-
-        # construct the shape
-        if valid:
-            # get the shape
-            if geom == "trace":
-                obj = sha.Polygon(data)
-            elif geom == "pad":
-                (coord, diameter) = data
-                obj = sha.Point(coord).buffer(diameter/2, quadsegs=16)
-            else:
-                raise ValueError("invalid shape")
-
-            # check data
-            if not obj.is_valid:
-                raise RuntimeError("invalid polygon")
-
-            # append
-            obj_list.append(obj)
+    # get the shape types
+    geom_list = [shape["geom"] for shape in shape_list]
+    for geom in geom_list:
+        if geom not in ["trace", "pad"]:
+            raise ValueError("invalid shape")
+
+    # get the indices of the shape types
+    idx_trace = [idx for idx, geom in enumerate(geom_list) if geom == "trace"]
+    idx_pad = [idx for idx, geom in enumerate(geom_list) if geom == "pad"]
+
+    # array for the shape objects (original order)
+    obj_list = np.empty(len(shape_list), dtype=object)
+
+    # construct the traces
+    if len(idx_trace) > 0:
+        data = np.array([shape_list[idx]["data"] for idx in idx_trace], dtype=np.float64)
+        obj_list[idx_trace] = sha.polygons(data)
+
+    # construct the pads
+    if len(idx_pad) > 0:
+        coord = np.array([shape_list[idx]["data"][0] for idx in idx_pad], dtype=np.float64)
+        diameter = np.array([shape_list[idx]["data"][1] for idx in idx_pad], dtype=np.float64)
+        obj_list[idx_pad] = _get_pad_polygon(coord, diameter)
+
+    # check data
+    if not np.all(sha.is_valid(obj_list)):
+        raise RuntimeError("invalid polygon")
+
+    # cast to a list
+    obj_list = list(obj_list)
 
     return obj_list
 
 
+def get_line(coord, width):
+    """
+    Create a Shapely object for a trace with a constant width.
+    The trace is created with a buffered line (round joins and caps).
+    The result is the same as the union of the trace segments and the round pads.
+    """
+
+    # get object
+    obj = sha.LineString(coord).buffer(width/2, quad_segs=16)
+
+    return obj
+
+
 def get_polygon(coord, keepout):
     """
     Create a polygon from a coordinate list.
@@ -163,19 +246,121 @@ def get_polygon(coord, keepout):
     return obj
 
 
-def get_union(obj_list, construct):
+def _get_divide(n_obj, divide):
+    """
+    Get the number of grid divisions (per direction) for a boolean operation.
+    The grid is chosen such that each tile contains the given number of elements.
+    """
+
+    # no subdivision
+    if divide is None:
+        return 1
+
+    # number of divisions per direction
+    n_div = int(np.sqrt(n_obj/divide))
+    n_div = max(1, n_div)
+
+    return n_div
+
+
+def _get_tile_box(bounds, n_div):
+    """
+    Get the rectangles of a grid subdividing a bounding box.
+    """
+
+    # extract bounds
+    (x_min, y_min, x_max, y_max) = bounds
+
+    # get the grid lines
+    x = np.linspace(x_min, x_max, n_div+1)
+    y = np.linspace(y_min, y_max, n_div+1)
+    (x_min, y_min) = np.meshgrid(x[:-1], y[:-1], indexing="ij")
+    (x_max, y_max) = np.meshgrid(x[1:], y[1:], indexing="ij")
+
+    # get the rectangles (vectorized)
+    box = sha.box(x_min.ravel(), y_min.ravel(), x_max.ravel(), y_max.ravel())
+
+    return box
+
+
+def _get_tile_union(obj_list, construct, n_div):
+    """
+    Union between several shapes with a grid subdivision.
+    The shapes are grouped by tiles (with the center of the bounding box).
+    The tiles are merged separately and the results are merged.
+    """
+
+    # get the center of the shapes (empty shapes are assigned to the first tile)
+    obj_list = np.array(obj_list, dtype=object)
+    bounds = sha.bounds(obj_list)
+    center = np.nan_to_num((bounds[:, 0:2]+bounds[:, 2:4])/2)
+
+    # get the tile indices
+    center_min = np.min(center, axis=0)
+    center_max = np.max(center, axis=0)
+    center_span = np.maximum(center_max-center_min, np.finfo(float).tiny)
+    idx = np.floor(n_div*(center-center_min)/center_span).astype(np.int64)
+    idx = np.clip(idx, 0, n_div-1)
+    idx = idx[:, 0]*n_div+idx[:, 1]
+
+    # merge the shapes per tile
+    tile_list = []
+    for idx_tmp in np.unique(idx):
+        obj_tmp = sha.unary_union(obj_list[idx == idx_tmp], grid_size=construct)
+        tile_list.append(obj_tmp)
+
+    # merge the tiles
+    obj = sha.unary_union(tile_list, grid_size=construct)
+
+    return obj
+
+
+def _get_tile_difference(add, sub, construct, n_div):
+    """
+    Difference between two shapes with a grid subdivision.
+    The shapes are clipped with the tiles and the differences are computed per tile.
+    The tiles are merged.
+    """
+
+    # get the tiles
+    box = _get_tile_box(add.bounds, n_div)
+
+    # clip the shapes (vectorized)
+    add = sha.intersection(add, box, grid_size=construct)
+    sub = sha.intersection(sub, box, grid_size=construct)
+
+    # remove the degenerated parts (lines and points along the tile boundaries)
+    add = [_get_clean_shape(obj_tmp) for obj_tmp in add]
+    sub = [_get_clean_shape(obj_tmp) for obj_tmp in sub]
+
+    # compute the difference (vectorized)
+    obj = sha.difference(add, sub, grid_size=construct)
+
+    # merge the tiles
+    obj = sha.unary_union(obj, grid_size=construct)
+
+    return obj
+
+
+def get_union(obj_list, construct, divide):
     """
     Union between several shapes.
+    Large unions are done with a grid subdivision.
     Clean the resulting shape.
     """
 
+    # get the number of divisions
+    n_div = _get_divide(len(obj_list), divide)
+
     # merge the shape
     if len(obj_list) == 0:
         obj = sha.Polygon([])
     elif len(obj_list) == 1:
         obj = obj_list.pop()
-    else:
+    elif n_div == 1:
         obj = sha.unary_union(obj_list, grid_size=construct)
+    else:
+        obj = _get_tile_union(obj_list, construct, n_div)
 
     # clean the shape
     obj = _get_clean_shape(obj)
@@ -183,17 +368,23 @@ def get_union(obj_list, construct):
     return obj
 
 
-def get_difference(add, sub, construct):
+def get_difference(add, sub, construct, divide):
     """
     Difference between two shapes.
+    Large differences are done with a grid subdivision.
     Clean the resulting shape.
     """
 
+    # get the number of divisions (with respect to the number of polygons)
+    n_div = _get_divide(sha.get_num_geometries(add), divide)
+
     # intersect the shape
     if add.is_empty or sub.is_empty:
         obj = add
-    else:
+    elif n_div == 1:
         obj = sha.difference(add, sub, grid_size=construct)
+    else:
+        obj = _get_tile_difference(add, sub, construct, n_div)
 
     # clean the shape
     obj = _get_clean_shape(obj)
@@ -12,9 +12,20 @@ __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
 
+import threading
+import functools
+import concurrent.futures
 import numpy as np
 from pyfreecoil.solver import geometry_shape
 
+# cache for the assembled shapes (vias and terminals)
+#   - the key is describing the input shapes (shape type and data)
+#   - the Shapely objects are immutable and can be shared between the designs
+#   - the traces are not cached (different for every design)
+_ASSEMBLE_CACHE = {}
+_ASSEMBLE_CACHE_SIZE = 1024
+_ASSEMBLE_CACHE_LOCK = threading.Lock()
+
 
 def _get_add_via(coord, width, layer_start, layer_stop, is_out, is_via):
     """
@@ -94,15 +105,23 @@ def _get_geom_coord(n_wdg, layer_wdg, coord_wdg, width_wdg, terminal):
     geom_trace = []
     geom_via = []
 
-    # get the via coordinates
-    for idx in idx_diff:
+    # extract the via data (all the vias at once)
+    coord_via = coord_wdg[idx_diff]
+    width_via = width_wdg[idx_diff]
+    is_out_via = is_out_wdg[idx_diff]
+    is_via_via = is_via_wdg[idx_diff]
+    layer_start_via = layer_wdg[idx_diff-1]
+    layer_stop_via = layer_wdg[idx_diff-0]
+
+    # get the via coordinates (single-row slices of the via data)
+    for i in range(len(idx_diff)):
         # extract data
-        coord_tmp = coord_wdg[[idx]]
-        width_tmp = width_wdg[[idx]]
-        is_out_tmp = is_out_wdg[[idx]]
-        is_via_tmp = is_via_wdg[[idx]]
-        layer_start = layer_wdg[idx-1]
-        layer_stop = layer_wdg[idx-0]
+        coord_tmp = coord_via[i:i+1]
+        width_tmp = width_via[i:i+1]
+        is_out_tmp = is_out_via[i:i+1]
+        is_via_tmp = is_via_via[i:i+1]
+        layer_start = layer_start_via[i]
+        layer_stop = layer_stop_via[i]
 
         # add via
         geom_via_tmp = _get_add_via(coord_tmp, width_tmp, layer_start, layer_stop, is_out_tmp, is_via_tmp)
@@ -112,12 +131,15 @@ def _get_geom_coord(n_wdg, layer_wdg, coord_wdg, width_wdg, terminal):
     for idx_a, idx_b in zip(idx_trace_a, idx_trace_b):
         # extract data
         n_pts_tmp = idx_b-idx_a+1
-        layer_tmp = np.unique(layer_wdg[idx_a:idx_b]).item()
+        layer_tmp = int(layer_wdg[idx_a])
         coord_tmp = coord_wdg[idx_a:idx_b+1]
         width_tmp = width_wdg[idx_a:idx_b+1]
         is_out_tmp = is_out_wdg[idx_a:idx_b+1]
         is_via_tmp = is_via_wdg[idx_a:idx_b+1]
 
+        # the trace is located on a single layer
+        assert np.all(layer_wdg[idx_a:idx_b] == layer_tmp), "invalid trace layer"
+
         # no vias inside a trace
         is_via_tmp[+1:-1] = False
 
@@ -161,30 +183,79 @@ def _get_terminal_coord(geom_trace, position):
     return geom_terminal
 
 
-def _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, simplify):
+def _get_shape_key(cad):
+    """
+    Get a hashable key describing a list of shapes.
+    The invalid shapes are ignored (not used for the Shapely objects).
+    """
+
+    key = []
+    for shape in cad:
+        if shape["valid"]:
+            data = np.concatenate([np.ravel(data_tmp) for data_tmp in shape["data"]])
+            key.append((shape["geom"], data.astype(np.float64).tobytes()))
+
+    return tuple(key)
+
+
+def _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, divide, simplify):
     """
-    Assemble and simplify the shapes
+    Assemble and simplify the shapes (cached).
+    The identical shapes (vias or terminals) are only constructed once.
+    """
+
+    # get the key describing the shapes
+    key_add = _get_shape_key(cad_add)
+    key_sub = _get_shape_key(cad_sub)
+    key_mask = _get_shape_key(cad_mask)
+    key = (key_add, key_sub, key_mask, construct, divide, simplify)
+
+    # reuse the shapes if available
+    with _ASSEMBLE_CACHE_LOCK:
+        if key in _ASSEMBLE_CACHE:
+            return _ASSEMBLE_CACHE[key]
+
+    # assemble the shapes
+    (obj, mask) = _get_shape_assemble_sub(cad_add, cad_sub, cad_mask, construct, divide, simplify, None)
+
+    # update the cache (remove the oldest entry if full)
+    with _ASSEMBLE_CACHE_LOCK:
+        if len(_ASSEMBLE_CACHE) >= _ASSEMBLE_CACHE_SIZE:
+            _ASSEMBLE_CACHE.pop(next(iter(_ASSEMBLE_CACHE)))
+        _ASSEMBLE_CACHE[key] = (obj, mask)
+
+    return obj, mask
+
+
+def _get_shape_assemble_sub(cad_add, cad_sub, cad_mask, construct, divide, simplify, fct_obj):
+    """
+    Assemble and simplify the shapes (without cache).
+    A function can be provided for creating the Shapely objects of the added and mask shapes.
     """
 
     # cast to shapes
-    cad_add = geometry_shape.get_shape(cad_add)
+    if fct_obj is None:
+        cad_add = geometry_shape.get_shape(cad_add)
+        cad_mask = geometry_shape.get_shape(cad_mask)
+    else:
+        (cad_add, cad_mask) = fct_obj()
     cad_sub = geometry_shape.get_shape(cad_sub)
-    cad_mask = geometry_shape.get_shape(cad_mask)
 
     # construct
-    add = geometry_shape.get_union(cad_add, construct)
-    sub = geometry_shape.get_union(cad_sub, construct)
-    mask = geometry_shape.get_union(cad_mask, construct)
-    obj = geometry_shape.get_difference(add, sub, construct)
+    add = geometry_shape.get_union(cad_add, construct, divide)
+    sub = geometry_shape.get_union(cad_sub, construct, divide)
+    mask = geometry_shape.get_union(cad_mask, construct, divide)
+    obj = geometry_shape.get_difference(add, sub, construct, divide)
 
-    # simplify
-    obj = geometry_shape.get_simplify(obj, simplify)
-    mask = geometry_shape.get_simplify(mask, simplify)
+    # simplify (skipped if disabled)
+    if simplify is not None:
+        obj = geometry_shape.get_simplify(obj, simplify)
+        mask = geometry_shape.get_simplify(mask, simplify)
 
     return obj, mask
 
 
-def _get_terminal_size(geom_via, simplify, construct):
+def _get_terminal_size(geom_via, simplify, construct, divide):
     """
     Get the 2D shapes composing a terminal.
     """
@@ -224,7 +295,7 @@ def _get_terminal_size(geom_via, simplify, construct):
         cad_mask.append(shape)
 
     # assemble the shapes
-    (obj, mask) = _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, simplify)
+    (obj, mask) = _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, divide, simplify)
 
     # assign
     geom_via["cad_add"] = cad_add
@@ -235,7 +306,7 @@ def _get_terminal_size(geom_via, simplify, construct):
     return geom_via
 
 
-def _get_via_size(geom_via, size, simplify, construct):
+def _get_via_size(geom_via, size, simplify, construct, divide):
     """
     Get the 2D shapes composing a via.
     """
@@ -290,7 +361,7 @@ def _get_via_size(geom_via, size, simplify, construct):
         cad_sub.append(shape_hole)
 
     # assemble the shapes
-    (obj, mask) = _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, simplify)
+    (obj, mask) = _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, divide, simplify)
 
     # assign
     geom_via["cad_add"] = cad_add
@@ -301,7 +372,44 @@ def _get_via_size(geom_via, size, simplify, construct):
     return geom_via
 
 
-def _get_trace_size(geom_trace, size, simplify, construct):
+def _get_trace_obj(coord, width, diameter_pad, shape_pad_list, shape_trace_list, is_seg, is_pad):
+    """
+    Get the Shapely objects composing a trace (selected segments and pads).
+    The runs of segments with a constant width are created with buffered lines.
+    The other segments and the pads not covered by the lines are created from the shapes.
+    """
+
+    # segments with a constant width (merged into buffered lines)
+    is_run = is_seg & (width[:-1] == width[+1:]) & (width[:-1] > 0.0)
+    is_taper = is_seg & np.logical_not(is_run)
+
+    # get the start and stop nodes of the runs
+    run = np.diff(np.concatenate(([0], is_run.astype(np.int64), [0])))
+    idx_start = np.flatnonzero(run == +1)
+    idx_stop = np.flatnonzero(run == -1)
+
+    # nodes covered by the buffered lines (round joins and caps)
+    is_cover = np.full(len(coord), False)
+    is_cover[:-1] |= is_run
+    is_cover[+1:] |= is_run
+
+    # pads which are not covered by the lines (or larger than the trace)
+    is_pad = is_pad & (np.logical_not(is_cover) | (diameter_pad > width))
+
+    # get the remaining shapes
+    shape_list = []
+    shape_list += [shape_trace_list[i] for i in np.flatnonzero(is_taper)]
+    shape_list += [shape_pad_list[i] for i in np.flatnonzero(is_pad)]
+
+    # create the objects
+    obj_list = geometry_shape.get_shape(shape_list)
+    for idx_a, idx_b in zip(idx_start, idx_stop):
+        obj_list.append(geometry_shape.get_line(coord[idx_a:idx_b+1], width[idx_a]))
+
+    return obj_list
+
+
+def _get_trace_size(geom_trace, size, simplify, construct, divide):
     """
     Get the 2D shapes composing a trace.
     """
@@ -325,51 +433,33 @@ def _get_trace_size(geom_trace, size, simplify, construct):
     cad_sub = []
     cad_mask = []
 
+    # get via size (all the nodes at once)
+    diameter_pad = np.where(is_via, width+2*via_pad, width)
+    diameter_via = width-2*via_clear
+    diameter_hole = diameter_via-2*via_plate
+
+    # get the pad and hole shapes (all the nodes at once)
+    shape_pad_list = geometry_shape.get_pad_list(coord, diameter_pad)
+    shape_hole_list = geometry_shape.get_pad_list(coord, diameter_hole)
+
     # get the pad coordinates
     for i in range(n_pts):
-        # extract
-        coord_tmp = coord[i]
-        width_tmp = width[i]
-        is_out_tmp = is_out[i]
-        is_via_tmp = is_via[i]
-
-        # get via size
-        diameter_pad = width_tmp+2*via_pad
-        diameter_via = width_tmp-2*via_clear
-        diameter_hole = diameter_via-2*via_plate
-
-        # handle normal nodes and via nodes
-        if is_via_tmp:
-            # get the pad shapes
-            shape_pad = geometry_shape.get_pad(coord_tmp, diameter_pad)
-            shape_hole = geometry_shape.get_pad(coord_tmp, diameter_hole)
-
-            # add the shape
-            cad_add.append(shape_pad)
-
-            # add mask (masks describe the shapes that should be inside the outline)
-            if not is_out_tmp:
-                cad_mask.append(shape_pad)
-
-            # put a hole in the via (if required)
-            if via_hole and (diameter_hole > via_min):
-                cad_sub.append(shape_hole)
-        else:
-            # get the pad shape
-            shape_pad = geometry_shape.get_pad(coord_tmp, width_tmp)
-
-            # add the shape
-            cad_add.append(shape_pad)
-
-            # add mask (masks describe the shapes that should be inside the outline)
-            if not is_out_tmp:
-                cad_mask.append(shape_pad)
+        # add the shape
+        cad_add.append(shape_pad_list[i])
 
-    # get the trace coordinates
-    for i in range(n_pts-1):
-        # get the trace shape
-        shape = geometry_shape.get_trace(coord[i+0], coord[i+1], width[i+0], width[i+1])
+        # add mask (masks describe the shapes that should be inside the outline)
+        if not is_out[i]:
+            cad_mask.append(shape_pad_list[i])
+
+        # put a hole in the via (if required)
+        if is_via[i] and via_hole and (diameter_hole[i] > via_min):
+            cad_sub.append(shape_hole_list[i])
+
+    # get the trace shapes (all the segments at once)
+    shape_trace_list = geometry_shape.get_trace(coord, width)
 
+    # get the trace coordinates
+    for i, shape in enumerate(shape_trace_list):
         # add the shape
         cad_add.append(shape)
 
@@ -377,8 +467,20 @@ def _get_trace_size(geom_trace, size, simplify, construct):
         if (not is_out[i+0]) and (not is_out[i+1]):
             cad_mask.append(shape)
 
-    # assemble the shapes
-    (obj, mask) = _get_shape_assemble(cad_add, cad_sub, cad_mask, construct, simplify)
+    # get the selected segments and pads for the added and mask shapes
+    is_seg_add = np.full(n_pts-1, True)
+    is_pad_add = np.full(n_pts, True)
+    is_seg_mask = np.logical_not(is_out[:-1]) & np.logical_not(is_out[+1:])
+    is_pad_mask = np.logical_not(is_out)
+
+    # function creating the Shapely objects (buffered lines for the constant width segments)
+    def fct_obj():
+        obj_add = _get_trace_obj(coord, width, diameter_pad, shape_pad_list, shape_trace_list, is_seg_add, is_pad_add)
+        obj_mask = _get_trace_obj(coord, width, diameter_pad, shape_pad_list, shape_trace_list, is_seg_mask, is_pad_mask)
+        return obj_add, obj_mask
+
+    # assemble the shapes (not cached, the traces are different for every design)
+    (obj, mask) = _get_shape_assemble_sub(cad_add, cad_sub, cad_mask, construct, divide, simplify, fct_obj)
 
     # assign
     geom_trace["cad_add"] = cad_add
@@ -389,6 +491,24 @@ def _get_trace_size(geom_trace, size, simplify, construct):
     return geom_trace
 
 
+def _get_parallel(fct, geom_list, n_thread):
+    """
+    Apply a function to a list of shapes with a thread pool.
+    The Shapely operations are releasing the GIL.
+    Small lists are processed sequentially.
+    """
+
+    # sequential processing
+    if (n_thread is None) or (len(geom_list) < n_thread):
+        return list(map(fct, geom_list))
+
+    # parallel processing
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_thread) as executor:
+        geom_list = list(executor.map(fct, geom_list))
+
+    return geom_list
+
+
 def get_data(data_coil, size, terminal, shapely, position, outline, keepout):
     """
     Create the shapes and layers composing a winding (traces, vias, and terminals).
@@ -397,6 +517,15 @@ def get_data(data_coil, size, terminal, shapely, position, outline, keepout):
     # extract data
     simplify = shapely["simplify"]
     construct = shapely["construct"]
+    divide = shapely["divide"]
+    simplify_primitives = shapely["simplify_primitives"]
+    n_thread = shapely["n_thread"]
+
+    # the vias and terminals are made of primitives (pads), simplification is optional
+    if simplify_primitives:
+        simplify_pad = simplify
+    else:
+        simplify_pad = None
 
     # extract data
     n_wdg = data_coil["n_wdg"]
@@ -417,17 +546,17 @@ def get_data(data_coil, size, terminal, shapely, position, outline, keepout):
     geom_src = _get_terminal_coord(geom_trace, "src")
     geom_sink = _get_terminal_coord(geom_trace, "sink")
 
-    # get the 2D via shapes
-    for idx, geom_tmp in enumerate(geom_via):
-        geom_via[idx] = _get_via_size(geom_tmp, size, simplify, construct)
+    # get the 2D via shapes (independent shapes, thread pool)
+    fct = functools.partial(_get_via_size, size=size, simplify=simplify_pad, construct=construct, divide=divide)
+    geom_via = _get_parallel(fct, geom_via, n_thread)
 
-    # get the 2D trace shapes
-    for idx, geom_tmp in enumerate(geom_trace):
-        geom_trace[idx] = _get_trace_size(geom_tmp, size, simplify, construct)
+    # get the 2D trace shapes (independent shapes, thread pool)
+    fct = functools.partial(_get_trace_size, size=size, simplify=simplify, construct=construct, divide=divide)
+    geom_trace = _get_parallel(fct, geom_trace, n_thread)
 
     # get the 2D terminal shapes
-    geom_src = _get_terminal_size(geom_src, simplify, construct)
-    geom_sink = _get_terminal_size(geom_sink, simplify, construct)
+    geom_src = _get_terminal_size(geom_src, simplify_pad, construct, divide)
+    geom_sink = _get_terminal_size(geom_sink, simplify_pad, construct, divide)
 
     # assign
     data_vector = {
@@ -7,19 +7,36 @@ __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
 import numpy as np
-import numpy.linalg as lna
+
+
+def _get_square(val):
+    """
+    Get the squared norm of a vector (along the last axis).
+    The complex values are viewed as real values (single fused pass).
+    """
+
+    # view complex values as real values
+    val = np.ascontiguousarray(val)
+    if np.iscomplexobj(val):
+        val = val.view(np.float64)
+
+    # get squared norm along vector
+    val = np.einsum("...i,...i->...", val, val)
+
+    return val
 
 
 def _get_quantile(val, quantile):
     """
     Get the quantile of the norm of a vector.
+    The values are stacked along the first axis (frequencies).
     """
 
     # get norm along vector
-    val = lna.norm(val, axis=1)
+    val = np.sqrt(_get_square(val))
 
     # get quantile along samples
-    val = np.quantile(val, quantile)
+    val = np.quantile(val, quantile, axis=-1)
 
     return val
 
@@ -28,13 +45,17 @@ def _get_norm(val, power):
     """
     Get the p-norm value of the norm of a vector.
     The exponent of the p-norm can be selected.
+    The values are stacked along the first axis (frequencies).
     """
 
-    # get norm along vector
-    val = lna.norm(val, axis=1)
+    # get squared norm along vector
+    val = _get_square(val)
 
-    # get p-norm along samples
-    val = np.mean(np.power(val, power))
+    # get p-norm along samples (the squared norm avoids the square root)
+    if power == 2:
+        val = np.mean(val, axis=-1)
+    else:
+        val = np.mean(np.power(val, power/2), axis=-1)
     val = np.power(val, 1/power)
 
     return val
@@ -51,40 +72,60 @@ def _get_value_terminal(source):
     return V, I
 
 
-def _get_extract_sweep(data_tmp, processing):
+def _get_extract_sweep(data_sweep, processing):
     """
-    Extract the solution at a given frequency.
+    Extract the solution for all the frequencies.
     Extract the inductance and resistance.
     Extract the current density (RMS value).
     Extract the magnetic field (quantile value).
+    The frequencies are stacked and processed at once.
     """
 
-    # extract
-    f = data_tmp["freq"]
-    var = data_tmp["var"]
-    source = data_tmp["source"]
-
     # extract
     H_qtl = processing["H_qtl"]
     J_pwr = processing["J_pwr"]
 
-    # parse terminal
-    (V, I) = _get_value_terminal(source)
-
-    # extract magnetic field (on the point cloud)
-    H = var["H_p"]["var"]
-
-    # extract current density (inside the conductors)
-    J = var["J_c"]["var"]
+    # get the size of the stacked data
+    n_freq = len(data_sweep)
+    assert n_freq > 0, "invalid solution"
+    data_first = next(iter(data_sweep.values()))
+    H_shape = np.shape(data_first["var"]["H_p"]["var"])
+    J_shape = np.shape(data_first["var"]["J_c"]["var"])
+
+    # init the stacked data
+    f = np.empty(n_freq, dtype=np.float64)
+    V = np.empty(n_freq, dtype=np.complex128)
+    I = np.empty(n_freq, dtype=np.complex128)
+    H = np.empty((n_freq, *H_shape), dtype=np.complex128)
+    J = np.empty((n_freq, *J_shape), dtype=np.complex128)
+
+    # stack the frequencies
+    for i, data_tmp in enumerate(data_sweep.values()):
+        # extract
+        var = data_tmp["var"]
+        source = data_tmp["source"]
+
+        # parse terminal
+        (V_tmp, I_tmp) = _get_value_terminal(source)
+
+        # add solution (magnetic field on the point cloud and current density inside the conductors)
+        f[i] = data_tmp["freq"]
+        V[i] = V_tmp
+        I[i] = I_tmp
+        H[i] = var["H_p"]["var"]
+        J[i] = var["J_c"]["var"]
 
     # get impedance
-    R = np.real(V/I)
-    X = np.imag(V/I)
+    Z = V/I
+    R = np.real(Z)
+    X = np.imag(Z)
     L = X/(2*np.pi*f)
 
-    # extract field
-    H = _get_quantile(H/I, H_qtl)
-    J = _get_norm(J/I, J_pwr)
+    # extract field (normalized with the current)
+    #   - the quantile and p-norm are computed on magnitudes
+    #   - the normalization is applied on the reduced values (positive scaling)
+    H = _get_quantile(H, H_qtl)/np.abs(I)
+    J = _get_norm(J, J_pwr)/np.abs(I)
 
     return f, R, L, H, J
 
@@ -169,32 +210,16 @@ def _get_matrix(data_sweep, processing):
     H_fact = processing["H_fact"]
     J_fact = processing["J_fact"]
 
-    # init the frequency-dependent parameters
-    f_vec = []
-    R_vec = []
-    L_vec = []
-    J_vec = []
-    H_vec = []
-
-    # assign the frequency-dependent parameters
-    for data_tmp in data_sweep.values():
-        # get field and terminals
-        (f, R, L, H, J) = _get_extract_sweep(data_tmp, processing)
-
-        # add solution
-        f_vec.append(f)
-        R_vec.append(R)
-        L_vec.append(L)
-        J_vec.append(J)
-        H_vec.append(H)
+    # get the frequency-dependent parameters (all the frequencies at once)
+    (f_vec, R_vec, L_vec, H_vec, J_vec) = _get_extract_sweep(data_sweep, processing)
 
     # save the data
     data_matrix = {
-        "f_vec": np.array(f_vec, dtype=np.float64),
-        "R_vec": R_fact*np.array(R_vec, dtype=np.float64),
-        "L_vec": L_fact*np.array(L_vec, dtype=np.float64),
-        "H_vec": H_fact*np.array(H_vec, dtype=np.float64),
-        "J_vec": J_fact*np.array(J_vec, dtype=np.float64),
+        "f_vec": f_vec,
+        "R_vec": R_fact*R_vec,
+        "L_vec": L_fact*L_vec,
+        "H_vec": H_fact*H_vec,
+        "J_vec": J_fact*J_vec,
     }
 
     return data_matrix
@@ -7,9 +7,15 @@ __author__ = "Thomas Guillod"
 __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
+import functools
 import numpy as np
 import shapely as sha
 
+# data type for the polygon coordinates passed to the mesher
+#   - contiguous arrays are used for all the coordinates
+#   - single precision can be used if accepted by the mesher (halves the memory)
+_COORD_DTYPE = np.float64
+
 
 def _get_shape_sub(obj, layer):
     """
@@ -23,13 +29,15 @@ def _get_shape_sub(obj, layer):
     assert obj.is_valid, "invalid shape: invalid"
     assert obj.is_simple, "invalid shape: simple"
 
-    # get exterior
-    coord_shell = np.vstack(obj.exterior.xy).transpose()
+    # get exterior (contiguous coordinate array)
+    coord_shell = sha.get_coordinates(obj.exterior)
+    coord_shell = np.ascontiguousarray(coord_shell, dtype=_COORD_DTYPE)
 
-    # get interiors
+    # get interiors (contiguous coordinate arrays)
     coord_holes = []
     for obj_tmp in obj.interiors:
-        coord_holes_tmp = np.vstack(obj_tmp.xy).transpose()
+        coord_holes_tmp = sha.get_coordinates(obj_tmp)
+        coord_holes_tmp = np.ascontiguousarray(coord_holes_tmp, dtype=_COORD_DTYPE)
         coord_holes.append(coord_holes_tmp)
 
     # get layers
@@ -77,6 +85,37 @@ def _get_shape(geom):
     return shape
 
 
+def _get_shape_merge(geom_list):
+    """
+    Create mesher shape data from several multi-polygons.
+    The shapes located on the same layers are merged together.
+    """
+
+    # group the shapes with respect to the layers
+    obj_group = {}
+    for geom in geom_list:
+        # get data
+        layer = tuple(geom["layer"])
+        obj = geom["obj"]
+
+        # check
+        assert isinstance(obj, sha.MultiPolygon), "invalid shape: type"
+        assert not obj.is_empty, "invalid shape: empty"
+        assert obj.is_valid, "invalid shape: invalid"
+
+        # add the shape to the group
+        obj_group.setdefault(layer, []).append(obj)
+
+    # merge the shapes for each group and split into polygons
+    shape = []
+    for layer, obj_list in obj_group.items():
+        obj = sha.unary_union(np.array(obj_list, dtype=object))
+        for obj_tmp in sha.get_parts(obj):
+            shape.append(_get_shape_sub(obj_tmp, layer))
+
+    return shape
+
+
 def _get_geometry_shape(data_vector):
     """
     Get the mesher shape data for the vias, traces, and terminals.
@@ -93,16 +132,8 @@ def _get_geometry_shape(data_vector):
     src = _get_shape(geom_src)
     sink = _get_shape(geom_sink)
 
-    # init the conductor
-    cond = []
-
-    # add the vias to the conductor
-    for geom in geom_via:
-        cond += _get_shape(geom)
-
-    # add the traces to the conductor
-    for geom in geom_trace:
-        cond += _get_shape(geom)
+    # get the conductor
+    cond = _get_shape_merge(geom_via+geom_trace)
 
     # assign shape data
     geometry_shape = {
@@ -184,9 +215,9 @@ def _get_domain_data():
     return conflict_rules, domain_connected, domain_adjacent
 
 
-def _get_pts_vec(span):
+def _get_pts_span(span):
     """
-    Create a vector for the point cloud definition.
+    Get the scalar parameters for a point cloud vector.
     """
 
     # extract
@@ -194,36 +225,44 @@ def _get_pts_vec(span):
     v_max = span["v_max"]
     n = span["n"]
 
+    return v_min, v_max, n
+
+
+def _get_pts_vec(v_min, v_max, n):
+    """
+    Create a vector for the point cloud definition.
+    """
+
     # span vector
     vec = np.linspace(v_min, v_max, n)
 
     return vec
 
 
-def _get_pts_cloud(cloud):
+@functools.lru_cache(maxsize=32)
+def _get_pts_cloud(x_span, y_span, z_min, z_max):
     """
-    Create a point cloud around the component.
+    Create a point cloud around the component (cached).
     The point cloud is used to compute the magnetic near-field.
+    The key is composed of the scalar parameters (constant across a sweep).
     """
 
-    # extract
-    x_vec = cloud["x_vec"]
-    y_vec = cloud["y_vec"]
-    z_max = cloud["z_max"]
-    z_min = cloud["z_min"]
-
     # get vector in all dimensions
-    x_vec = _get_pts_vec(x_vec)
-    y_vec = _get_pts_vec(y_vec)
+    x_vec = _get_pts_vec(*x_span)
+    y_vec = _get_pts_vec(*y_span)
+
+    # get the size of the point cloud
+    nx = len(x_vec)
+    ny = len(y_vec)
 
-    # span the complete point cloud
-    (x_mat, y_mat, z_mat) = np.meshgrid(x_vec, y_vec, [z_min, z_max])
-    x_mat = x_mat.flatten()
-    y_mat = y_mat.flatten()
-    z_mat = z_mat.flatten()
+    # assemble the point cloud coordinates (same ordering as meshgrid, without temporary grids)
+    pts_cloud = np.empty((nx*ny*2, 3), dtype=np.float64)
+    pts_cloud[:, 0] = np.tile(np.repeat(x_vec, 2), ny)
+    pts_cloud[:, 1] = np.repeat(y_vec, 2*nx)
+    pts_cloud[:, 2] = np.tile([z_min, z_max], nx*ny)
 
-    # assemble the point cloud coordinates
-    pts_cloud = np.vstack((x_mat, y_mat, z_mat)).transpose()
+    # the cached array should not be modified
+    pts_cloud.flags.writeable = False
 
     return pts_cloud
 
@@ -246,8 +285,14 @@ def get_data(data_vector, voxel, mesh, cloud):
     # get the voxel conflict resolution and connection rules
     (conflict_rules, domain_connected, domain_adjacent) = _get_domain_data()
 
-    # generate the point cloud
-    pts_cloud = _get_pts_cloud(cloud)
+    # extract the point cloud parameters
+    x_span = _get_pts_span(cloud["x_vec"])
+    y_span = _get_pts_span(cloud["y_vec"])
+    z_max = cloud["z_max"]
+    z_min = cloud["z_min"]
+
+    # generate the point cloud (cached, same for all the designs)
+    pts_cloud = _get_pts_cloud(x_span, y_span, z_min, z_max)
 
     # define the cloud point
     data_point = {
@@ -47,20 +47,14 @@ def _get_base_def():
     return material_def, source_def
 
 
-def _get_single_sweep(mat, src, freq):
+def _get_material_val(mat):
     """
-    Get solver sweep for a given frequency.
+    Get the material values (frequency independent).
     """
 
     # extract
     rho_re = mat["rho_re"]
     rho_im = mat["rho_im"]
-    V_src = src["V_src"]
-    R_src = src["R_src"]
-    L_src = src["L_src"]
-
-    # get source impedance
-    X_src = 2*np.pi*freq*L_src
 
     # assign the material conductivity
     material_val = {
@@ -68,10 +62,48 @@ def _get_single_sweep(mat, src, freq):
         "winding_terminal": {"rho_re": rho_re, "rho_im": rho_im},
     }
 
+    return material_val
+
+
+def _get_source_val(src):
+    """
+    Get the source values (frequency independent).
+    """
+
+    # extract
+    V_src = src["V_src"]
+    R_src = src["R_src"]
+    L_src = src["L_src"]
+
+    # get the source values
+    source_val = {
+        "V_re": V_src.real,
+        "V_im": V_src.imag,
+        "R_src": R_src,
+        "L_src": L_src,
+    }
+
+    return source_val
+
+
+def _get_single_sweep(material_val, source_val, freq):
+    """
+    Get solver sweep for a given frequency.
+    """
+
+    # extract
+    V_re = source_val["V_re"]
+    V_im = source_val["V_im"]
+    R_src = source_val["R_src"]
+    L_src = source_val["L_src"]
+
+    # get source impedance
+    X_src = 2*np.pi*freq*L_src
+
     # assign the source values and impedances
     source_val = {
-        "winding_src": {"V_re": +V_src.real, "V_im": +V_src.imag, "Z_re": R_src, "Z_im": X_src},
-        "winding_sink": {"V_re": -V_src.real, "V_im": -V_src.imag, "Z_re": R_src, "Z_im": X_src},
+        "winding_src": {"V_re": +V_re, "V_im": +V_im, "Z_re": R_src, "Z_im": X_src},
+        "winding_sink": {"V_re": -V_re, "V_im": -V_im, "Z_re": R_src, "Z_im": X_src},
     }
 
     # create a solver sweep with the specified frequency
@@ -97,6 +129,10 @@ def _get_all_sweep(excitation):
     mat = excitation["mat"]
     src = excitation["src"]
 
+    # get the frequency independent values (shared between the sweeps)
+    material_val = _get_material_val(mat)
+    source_val = _get_source_val(src)
+
     # init the dicts
     sweep_solver = {}
 
@@ -106,7 +142,7 @@ def _get_all_sweep(excitation):
         tag_sweep = "freq_%d" % i
 
         # add the sweep
-        sweep_solver[tag_sweep] = _get_single_sweep(mat, src, freq)
+        sweep_solver[tag_sweep] = _get_single_sweep(material_val, source_val, freq)
 
     return sweep_solver
 
@@ -78,10 +78,11 @@ def run_mesh(data_vector, data_component):
     return data_voxel
 
 
-def run_solve(data_voxel, data_component, data_tolerance):
+def run_solve(data_voxel, data_component, data_tolerance, return_solution=True):
     """
     Run the PyPEEC solver for a geometry (field simulation).
     Extract features from the obtained results (mesher and solver).
+    The solver results are only returned if required (None otherwise).
     """
 
     # extract data
@@ -97,6 +98,10 @@ def run_solve(data_voxel, data_component, data_tolerance):
     # extract and parse the results
     data_peec = pypeec_extract.get_final(data_voxel, data_solution, processing)
 
+    # release the solver results (large field arrays) before returning
+    if not return_solution:
+        data_solution = None
+
     return data_solution, data_peec
 
 
@@ -111,20 +116,33 @@ def write_shaper(folder, data_vector, data_shaper):
     param_mask = data_shaper["param_mask"]
     param_shape = data_shaper["param_shape"]
     param_terminal = data_shaper["param_terminal"]
+    param_save = data_shaper["param_save"]
+
+    # extract the save options
+    dpi = param_save["dpi"]
+    compress = param_save["compress"]
+
+    # extract the data shared between the plots
+    data_shared = geometry_plot.get_shared(data_vector, param_shared)
 
     # run the plots
-    geometry_plot.run_mask(data_vector, param_shared, param_mask)
-    geometry_plot.run_terminal(data_vector, param_shared, param_terminal)
-    geometry_plot.run_shape(data_vector, param_shared, param_shape)
-
-    # save the plots
-    fig_list = plt.get_fignums()
-    for fig in fig_list:
-        plt.figure(fig)
-        plt.savefig(os.path.join(folder, "shaper_%d.png" % fig), dpi=500)
-
-    # close the plots
-    plt.close('all')
+    geometry_plot.run_mask(data_shared, param_mask)
+    geometry_plot.run_terminal(data_shared, param_terminal)
+    geometry_plot.run_shape(data_shared, param_shape)
+
+    # get the figures and detach them from pyplot (the figures are released after saving)
+    fig_dict = {num: plt.figure(num) for num in plt.get_fignums()}
+    for fig in fig_dict.values():
+        plt.close(fig)
+
+    # save the plots (sequentially, matplotlib is not thread-safe)
+    #   - the figures are removed from the dict when saved
+    #   - the memory is released incrementally
+    while len(fig_dict) > 0:
+        (num, fig) = fig_dict.popitem()
+        filename = os.path.join(folder, "shaper_%d.png" % num)
+        fig.savefig(filename, dpi=dpi, pil_kwargs={"compress_level": compress})
+        fig.clear()
 
 
 def write_viewer(folder, data_voxel, data_viewer):
@@ -21,7 +21,7 @@ def get_run(filename):
 
     # load data
     data = scisave.load_data(filename)
-    name = getattr(filename, "stem")
+    name = filename.stem
 
     LOGGER.info("====================== START: %s" % name)
 
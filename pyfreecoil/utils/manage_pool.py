@@ -6,12 +6,19 @@ __author__ = "Thomas Guillod"
 __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
+import os
+import atexit
+import itertools
+import importlib
 import multiprocessing
 import threading
 import time
 
-# function to be called
-FCT_COMPUTE = None
+# functions to be called (assigned once per process by the pool initializer)
+#   - the functions are bound methods with large data (design parameters)
+#   - the functions are not pickled with the tasks (only the function index)
+#   - each backend has dedicated processes (no conflict between backends)
+_FCT_LIST = None
 
 
 def _fct_call_pool(args):
@@ -19,20 +26,190 @@ def _fct_call_pool(args):
     Call the user specified function and return the results (used by FctPool and QueuePool).
     """
 
-    return FCT_COMPUTE(*args)
+    (idx_fct, args) = args
 
+    return _FCT_LIST[idx_fct](*args)
 
-def _fct_init_pool(fct_compute):
+
+def _get_count(args):
+    """
+    Get the number of tasks (the arguments are sized sequences).
+    The number of tasks is the length of the shortest sequence (same as zip).
+    """
+
+    if len(args) == 0:
+        return 0
+
+    return min(map(len, args))
+
+
+def _get_chunksize(n_total, n_parallel, chunksize):
+    """
+    Get the number of tasks sent together to the processes.
+    If not specified, the tasks are split into four chunks per process (same heuristic as map).
     """
-    Assign the function for each process (used and FctPool).
+
+    if chunksize is None:
+        chunksize = max(1, n_total//(4*n_parallel))
+
+    return chunksize
+
+
+def _fct_init_pool(fct_list, cpu_list, cpu_count, warmup):
+    """
+    Assign the functions for each process (used by FctPool and QueuePool).
+    Pin the process to a CPU (if required).
+    Import the modules used by the tasks (before the first task).
     Call during the initialization of the process pool.
     """
 
     # get global
-    global FCT_COMPUTE
+    global _FCT_LIST
+
+    # import the modules lazily loaded by the tasks (parallel with the startup of the other processes)
+    for module in warmup:
+        importlib.import_module(module)
 
     # assign global
-    FCT_COMPUTE = fct_compute
+    _FCT_LIST = fct_list
+
+    # pin the process to a CPU (the recycled processes are reusing the CPUs)
+    if cpu_list is not None:
+        with cpu_count.get_lock():
+            idx = cpu_count.value
+            cpu_count.value += 1
+        os.sched_setaffinity(0, {cpu_list[idx % len(cpu_list)]})
+
+
+class _ProcessBackend:
+    """
+    Process pool shared between FctPool and QueuePool:
+        - The processes are created once for several functions.
+        - The functions are selected with an index (not pickled with the tasks).
+        - The processes are reaped at exit (if not closed before).
+    """
+
+    def __init__(self, n_parallel, fct_list, start_method, max_tasks, affinity, warmup):
+        """
+        Constructor.
+        Store the evaluation functions.
+        Create the process pool.
+        The start method can be selected (None for the platform default).
+        The processes can be recycled after a given number of tasks (None for no recycling).
+        The processes can be pinned to distinct CPUs (if supported by the platform).
+        The processes can import modules at startup (empty for no imports).
+        """
+
+        # assign
+        self.n_parallel = n_parallel
+        self.fct_list = tuple(fct_list)
+
+        # serial evaluation (no pool)
+        if self.n_parallel == 0:
+            self.pool_obj = None
+            return
+
+        # get the multiprocessing context
+        ctx = multiprocessing.get_context(start_method)
+
+        # get the CPUs and a shared counter for assigning the processes
+        if affinity and hasattr(os, "sched_setaffinity"):
+            cpu_list = sorted(os.sched_getaffinity(0))
+            cpu_count = ctx.Value("i", 0)
+        else:
+            cpu_list = None
+            cpu_count = None
+
+        # create and init pool
+        args = [self.fct_list, cpu_list, cpu_count, tuple(warmup)]
+        self.pool_obj = ctx.Pool(self.n_parallel, _fct_init_pool, args, maxtasksperchild=max_tasks)
+
+        # reap the processes at exit
+        atexit.register(self.terminate)
+
+    def get_index(self, fct_compute):
+        """
+        Get the index of a function served by the backend.
+        """
+
+        assert fct_compute in self.fct_list, "invalid function (not served by the backend)"
+
+        return self.fct_list.index(fct_compute)
+
+    def apply(self, idx_fct, args):
+        """
+        Parallel blocking call.
+        """
+
+        return self.pool_obj.apply(_fct_call_pool, [(idx_fct, args)])
+
+    def imap(self, idx_fct, args_iter, chunksize):
+        """
+        Vectorized call (results in the same order as the arguments).
+        """
+
+        return self.pool_obj.imap(_fct_call_pool, zip(itertools.repeat(idx_fct), args_iter), chunksize=chunksize)
+
+    def imap_unordered(self, idx_fct, args_iter, chunksize):
+        """
+        Vectorized call (results as completed).
+        """
+
+        return self.pool_obj.imap_unordered(_fct_call_pool, zip(itertools.repeat(idx_fct), args_iter), chunksize=chunksize)
+
+    def _get_release(self, fct_release):
+        """
+        Release the process pool (close or terminate) and wait for the processes.
+        """
+
+        atexit.unregister(self.terminate)
+        fct_release()
+        self.pool_obj.join()
+        self.pool_obj = None
+
+    def close(self):
+        """
+        Close the process pool (wait for the pending tasks).
+        """
+
+        if self.pool_obj is not None:
+            self._get_release(self.pool_obj.close)
+
+    def terminate(self):
+        """
+        Terminate the process pool (discard the pending tasks).
+        """
+
+        if self.pool_obj is not None:
+            self._get_release(self.pool_obj.terminate)
+
+
+def get_backend(n_parallel, fct_list, start_method=None, max_tasks=None, affinity=False, warmup=()):
+    """
+    Create a process pool shared between several FctPool and QueuePool.
+    The backend should be closed after the pools.
+    """
+
+    return _ProcessBackend(n_parallel, fct_list, start_method, max_tasks, affinity, warmup)
+
+
+def _get_backend_pool(n_parallel, fct_compute, start_method, max_tasks, affinity, warmup, backend):
+    """
+    Get the backend used by a pool (used by FctPool and QueuePool).
+    If no backend is provided, a dedicated backend is created (owned by the pool).
+    """
+
+    if backend is None:
+        backend = _ProcessBackend(n_parallel, [fct_compute], start_method, max_tasks, affinity, warmup)
+        is_owner = True
+    else:
+        assert backend.n_parallel == n_parallel, "invalid backend (number of processes)"
+        is_owner = False
+
+    # get the function index
+    idx_fct = backend.get_index(fct_compute)
+
+    return backend, idx_fct, is_owner
 
 
 class _ThreadException(threading.Thread):
@@ -42,12 +219,11 @@ class _ThreadException(threading.Thread):
     Flag exception into a class property.
     """
 
-    def __init__(self, n_total, call_iter, delay_collect, delay_timeout, fct_collect):
+    def __init__(self, n_total, call_iter, delay_collect, fct_collect):
         # assign values
         self.n_total = n_total
         self.call_iter = call_iter
         self.delay_collect = delay_collect
-        self.delay_timeout = delay_timeout
         self.fct_collect = fct_collect
 
         # contain eventual exceptions
@@ -60,28 +236,21 @@ class _ThreadException(threading.Thread):
         # init collection data
         n_count = 0
         out_list = []
-        timestamp = time.time()
+        deadline = time.monotonic()+self.delay_collect
 
         # collect immediately after starting
         self.fct_collect(out_list, n_count, self.n_total)
 
-        # collect the results when available
-        while True:
-            # get the data from the queue
-            try:
-                out = self.call_iter.next(self.delay_timeout)
-                out_list.append(out)
-                n_count += 1
-            except multiprocessing.TimeoutError:
-                pass
-            except StopIteration:
-                break
-
-            # collect is required
-            delay_now = time.time() - timestamp
-            if delay_now > self.delay_collect:
+        # collect the results when available (blocking until a result is available)
+        for out in self.call_iter:
+            # add the data
+            out_list.append(out)
+            n_count += 1
+
+            # collect is required (only checked when new data are available)
+            if time.monotonic() >= deadline:
                 self.fct_collect(out_list, n_count, self.n_total)
-                timestamp = time.time()
+                deadline = time.monotonic()+self.delay_collect
                 out_list = []
 
         # collect all remaining results
@@ -101,25 +270,27 @@ class QueuePool:
         - A thread is collecting the results when available.
     """
 
-    def __init__(self, n_parallel, delay_collect, delay_timeout, fct_collect, fct_compute):
+    def __init__(
+            self, n_parallel, delay_collect, fct_collect, fct_compute,
+            chunksize=None, start_method=None, max_tasks=None, affinity=False, warmup=(), backend=None,
+    ):
         """
         Constructor.
         Store the evaluation function.
-        Create the process pool and the queue.
+        Create the process pool (or use a shared backend).
         """
 
         # assign
         self.n_parallel = n_parallel
+        self.chunksize = chunksize
         self.delay_collect = delay_collect
-        self.delay_timeout = delay_timeout
         self.fct_compute = fct_compute
         self.fct_collect = fct_collect
 
-        # create and init pool and queue
-        if self.n_parallel == 0:
-            self.pool_obj = None
-        else:
-            self.pool_obj = multiprocessing.Pool(n_parallel, _fct_init_pool, [self.fct_compute])
+        # create the process pool (or use a shared backend)
+        (self.backend, self.idx_fct, self.is_owner) = _get_backend_pool(
+            n_parallel, fct_compute, start_method, max_tasks, affinity, warmup, backend,
+        )
 
     def _get_map_parallel(self, *args):
         """
@@ -128,13 +299,16 @@ class QueuePool:
         """
 
         # count data
-        n_total = len(list(zip(*args)))
+        n_total = _get_count(args)
+
+        # get the number of tasks per chunk
+        chunksize = _get_chunksize(n_total, self.n_parallel, self.chunksize)
 
         # run in parallel
-        call_iter = self.pool_obj.imap_unordered(_fct_call_pool, zip(*args), chunksize=1)
+        call_iter = self.backend.imap_unordered(self.idx_fct, zip(*args), chunksize)
 
         # start collecting thread
-        thread = _ThreadException(n_total, call_iter, self.delay_collect, self.delay_timeout, self.fct_collect)
+        thread = _ThreadException(n_total, call_iter, self.delay_collect, self.fct_collect)
         thread.start()
         thread.join()
 
@@ -148,7 +322,7 @@ class QueuePool:
         """
 
         # count data
-        n_total = len(list(zip(*args)))
+        n_total = _get_count(args)
 
         # init counter
         n_count = 0
@@ -171,11 +345,37 @@ class QueuePool:
 
     def close(self):
         """
-        Close the process pool and the queue.
+        Close the process pool (if not shared).
+        """
+
+        if self.is_owner:
+            self.backend.close()
+
+    def terminate(self):
+        """
+        Terminate the process pool (if not shared).
+        """
+
+        if self.is_owner:
+            self.backend.terminate()
+
+    def __enter__(self):
+        """
+        Enter the context (the process pool is already created).
         """
 
-        if self.n_parallel != 0:
-            self.pool_obj.close()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Exit the context and wait for the processes.
+        Close the process pool (terminate the process pool if an exception occurred).
+        """
+
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
 
 
 class FctPool:
@@ -185,22 +385,25 @@ class FctPool:
         - Vectorized blocking call (imap function).
     """
 
-    def __init__(self, n_parallel, fct_compute):
+    def __init__(
+            self, n_parallel, fct_compute,
+            chunksize=None, start_method=None, max_tasks=None, affinity=False, warmup=(), backend=None,
+    ):
         """
         Constructor.
         Store the evaluation function.
-        Create the process pool.
+        Create the process pool (or use a shared backend).
         """
 
         # assign
         self.n_parallel = n_parallel
+        self.chunksize = chunksize
         self.fct_compute = fct_compute
 
-        # create and init pool
-        if self.n_parallel == 0:
-            self.pool_obj = None
-        else:
-            self.pool_obj = multiprocessing.Pool(n_parallel, _fct_init_pool, [self.fct_compute])
+        # create the process pool (or use a shared backend)
+        (self.backend, self.idx_fct, self.is_owner) = _get_backend_pool(
+            n_parallel, fct_compute, start_method, max_tasks, affinity, warmup, backend,
+        )
 
     def get_fct(self, *args):
         """
@@ -210,7 +413,7 @@ class FctPool:
         if self.n_parallel == 0:
             out = self.fct_compute(*args)
         else:
-            out = self.pool_obj.apply(_fct_call_pool, [args])
+            out = self.backend.apply(self.idx_fct, args)
 
         return out
 
@@ -222,15 +425,43 @@ class FctPool:
         if self.n_parallel == 0:
             out = [self.fct_compute(*args_tmp) for args_tmp in zip(*args)]
         else:
-            out = self.pool_obj.imap(_fct_call_pool, zip(*args), chunksize=1)
+            n_total = _get_count(args)
+            chunksize = _get_chunksize(n_total, self.n_parallel, self.chunksize)
+            out = self.backend.imap(self.idx_fct, zip(*args), chunksize)
             out = list(out)
 
         return out
 
     def close(self):
         """
-        Close the process pool.
+        Close the process pool (if not shared).
+        """
+
+        if self.is_owner:
+            self.backend.close()
+
+    def terminate(self):
+        """
+        Terminate the process pool (if not shared).
+        """
+
+        if self.is_owner:
+            self.backend.terminate()
+
+    def __enter__(self):
+        """
+        Enter the context (the process pool is already created).
         """
 
-        if self.n_parallel != 0:
-            self.pool_obj.close()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Exit the context and wait for the processes.
+        Close the process pool (terminate the process pool if an exception occurred).
+        """
+
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
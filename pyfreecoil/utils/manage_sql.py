@@ -8,6 +8,7 @@ The database consists of two tables:
 
 For the database maintenance and backup:
     - the PostgreSQL utils are called ("pg_restore", "pg_dump", and "vacuumdb")
+    - the dumps are using the directory format (parallel dump and restore)
     - the credentials are passed through environment variables (not encrypted)
 """
 
@@ -15,15 +16,29 @@ __author__ = "Thomas Guillod"
 __copyright__ = "Thomas Guillod - Dartmouth College"
 __license__ = "Mozilla Public License Version 2.0"
 
+import os
+import io
 import time
+import random
+import functools
+import concurrent.futures
+import struct
 import psycopg2
 import psycopg2.sql
-import psycopg2.extras
+import psycopg2.extensions
 import pandas as pd
 import numpy as np
 import subprocess
 
 
+# size of the scalar types in the SQL binary format
+_COPY_SIZE = {
+    "int": 4,
+    "float": 4,
+    "bool": 1,
+}
+
+
 def _get_sql_type(var_type):
     """
     Get the corresponding SQL type from a data type.
@@ -53,62 +68,389 @@ def _get_sql_type(var_type):
     return sql_type
 
 
-def _get_sql_cast(var_type, var):
+def _get_sql_scalar(var, dtype):
+    """
+    Transform scalars into the SQL binary format (list of fields).
+    """
+
+    # check the integer range (no silent overflow)
+    if np.issubdtype(var.dtype, np.integer):
+        assert np.all(np.abs(var) <= np.iinfo(np.int32).max), "invalid integer (out of range)"
+
+    # length and value for each field
+    elem = np.empty(len(var), dtype=[("len", ">i4"), ("val", dtype)])
+    elem["len"] = np.dtype(dtype).itemsize
+    elem["val"] = var
+
+    # split the fields (bytes objects)
+    field = elem.view("V%d" % elem.itemsize).tolist()
+
+    return field
+
+
+def _get_sql_array(var, dtype, oid):
     """
-    Transform data from Python to SQL format.
+    Transform an array into the SQL binary format (PostgreSQL array layout).
     """
 
     # check
     if var is None:
-        return var
+        return struct.pack("!i", -1)
+
+    # cast (without copy if the type is matching)
+    var = np.asarray(var)
+    if np.issubdtype(var.dtype, np.integer):
+        assert np.all(np.abs(var) <= np.iinfo(np.int32).max), "invalid integer (out of range)"
+    var = var.astype(dtype, copy=False)
+
+    # the empty arrays have no dimensions
+    if var.size == 0:
+        shape = ()
+    else:
+        shape = var.shape
+
+    # header (dimensions, null flag, element type, and size and lower bound for each dimension)
+    header = struct.pack("!iii", len(shape), 0, oid)
+    for n in shape:
+        header += struct.pack("!ii", n, 1)
 
-    # parse
+    # elements (length and value for each element)
+    elem = np.empty(var.size, dtype=[("len", ">i4"), ("val", dtype)])
+    elem["len"] = np.dtype(dtype).itemsize
+    elem["val"] = var.ravel()
+
+    # assemble the field
+    data = header+elem.tobytes()
+
+    return struct.pack("!i", len(data))+data
+
+
+def _get_sql_column(var_type, var):
+    """
+    Transform a column from Python to SQL binary format (list of fields with length and value).
+    """
+
+    # parse (INTEGER, REAL, and BOOLEAN types)
     if var_type == "int":
-        var = int(var)
+        field = _get_sql_scalar(var.to_numpy(dtype=np.int64), ">i4")
     elif var_type == "float":
-        var = float(var)
+        field = _get_sql_scalar(var.to_numpy(dtype=np.float64), ">f4")
     elif var_type == "bool":
-        var = bool(var)
+        field = _get_sql_scalar(var.to_numpy(dtype=bool), "?")
     elif var_type in ["int_1D", "int_2D"]:
-        var = np.array(var, dtype=np.int64).tolist()
+        field = [_get_sql_array(var_tmp, ">i4", 23) for var_tmp in var]
     elif var_type in ["float_1D", "float_2D"]:
-        var = np.array(var, dtype=np.float64).tolist()
+        field = [_get_sql_array(var_tmp, ">f4", 700) for var_tmp in var]
     elif var_type in ["bool_1D", "bool_2D"]:
-        var = np.array(var, dtype=bool).tolist()
+        field = [_get_sql_array(var_tmp, "?", 16) for var_tmp in var]
     else:
         raise ValueError("invalid type")
 
+    return field
+
+
+def _get_copy_int(buf, pos):
+    """
+    Read 32-bit integers from a binary copy buffer (at the given positions).
+    """
+
+    idx = np.add.outer(pos, np.arange(4))
+    var = buf[idx].view(">i4").reshape(len(pos))
+
     return var
 
 
-def _get_df_cast(var_type, var):
+def _get_copy_layout(var_type_list):
     """
-    Transform data from SQL to Python format.
+    Get the layout of the rows in the SQL binary format.
+    The consecutive scalar fields are merged (fixed size).
+    The array fields are kept separated (variable size).
     """
 
-    # check
-    if var is None:
-        return var
+    layout = []
+    for idx, var_type in enumerate(var_type_list):
+        size = _COPY_SIZE.get(var_type)
+        if size is None:
+            layout.append(([idx], [0], None))
+        elif (len(layout) > 0) and (layout[-1][2] is not None):
+            (idx_list, rel_list, width) = layout[-1]
+            layout[-1] = (idx_list+[idx], rel_list+[width], width+4+size)
+        else:
+            layout.append(([idx], [0], 4+size))
+
+    return layout
+
+
+def _get_copy_header(buf):
+    """
+    Parse the header of a binary copy buffer (signature, flags, and header extension).
+    Return the position of the first row (None if the header is incomplete).
+    """
+
+    # check the size
+    if len(buf) < 19:
+        return None
+
+    # check the signature and the flags
+    assert bytes(buf[0:11]) == b"PGCOPY\n\xff\r\n\x00", "invalid copy data (signature)"
+    (flag, n_ext) = struct.unpack_from("!ii", buf, 11)
+    assert flag == 0, "invalid copy data (flags)"
+
+    # check the header extension
+    if len(buf) < (19+n_ext):
+        return None
+
+    return 19+n_ext
+
+
+def _get_copy_position(buf, pos, layout, n_field):
+    """
+    Get the positions of the fields in a binary copy buffer (PostgreSQL binary copy format).
+    The buffer is parsed until the trailer or until an incomplete row.
+    The scalar fields have a fixed size (consecutive scalars are skipped at once).
+    The array fields have a variable size (the length is read for each field).
+    """
+
+    # init the parsing
+    unpack = struct.Struct("!i").unpack_from
+    pos_layout = [[] for _ in layout]
+    n_buf = len(buf)
+    n_row = 0
+    is_end = False
+
+    # walk through the complete rows
+    while (pos+2) <= n_buf:
+        # get the number of fields (the trailer is signaled by -1)
+        (n_field_tmp,) = struct.unpack_from("!h", buf, pos)
+        if n_field_tmp == -1:
+            pos += 2
+            is_end = True
+            break
+        assert n_field_tmp == n_field, "invalid copy data (number of fields)"
+
+        # get the position of the fields
+        pos_tmp = pos+2
+        for (idx_list, rel_list, width), pos_list in zip(layout, pos_layout):
+            pos_list.append(pos_tmp)
+            if width is None:
+                if (pos_tmp+4) > n_buf:
+                    pos_tmp = n_buf+1
+                    break
+                (width_tmp,) = unpack(buf, pos_tmp)
+                pos_tmp += 4+max(width_tmp, 0)
+            else:
+                pos_tmp += width
+
+        # stop at incomplete rows
+        if pos_tmp > n_buf:
+            break
+
+        # next row
+        n_row += 1
+        pos = pos_tmp
+
+    # positions of the fields (length word) for the complete rows
+    pos_field = [None]*n_field
+    for (idx_list, rel_list, width), pos_list in zip(layout, pos_layout):
+        pos_list = np.array(pos_list[:n_row], dtype=np.int64)
+        for idx, rel in zip(idx_list, rel_list):
+            pos_field[idx] = pos_list+rel
+
+    return pos_field, pos, is_end
+
+
+def _get_copy_scalar(buf, pos, dtype, dtype_out):
+    """
+    Transform scalar fields from the SQL binary format into an array.
+    """
+
+    # check the field length (no null values)
+    size = np.dtype(dtype).itemsize
+    assert np.all(_get_copy_int(buf, pos) == size), "invalid copy data (scalar)"
+
+    # get the values
+    idx = np.add.outer(pos+4, np.arange(size))
+    var = buf[idx].view(dtype).reshape(len(pos)).astype(dtype_out)
+
+    return var
+
+
+def _get_copy_array(buf, pos, dtype, dtype_out):
+    """
+    Transform array fields from the SQL binary format into a column of arrays.
+    The elements are extracted at once (the arrays are views).
+    """
+
+    # check the field length (no null values)
+    assert np.all(_get_copy_int(buf, pos) >= 0), "invalid copy data (array)"
+
+    # array header (number of dimensions and null flag)
+    n_dim = _get_copy_int(buf, pos+4)
+    has_null = _get_copy_int(buf, pos+8)
+    assert np.all(n_dim <= 2), "invalid copy data (array dimension)"
+    assert np.all(has_null == 0), "invalid copy data (array null)"
+
+    # array shape (size of the dimensions, the empty arrays have no dimensions)
+    dim_1 = np.zeros(len(pos), dtype=np.int64)
+    dim_2 = np.ones(len(pos), dtype=np.int64)
+    dim_1[n_dim >= 1] = _get_copy_int(buf, pos[n_dim >= 1]+16)
+    dim_2[n_dim >= 2] = _get_copy_int(buf, pos[n_dim >= 2]+24)
+
+    # number of elements and position of the first element
+    size = np.dtype(dtype).itemsize
+    n_elem = dim_1*dim_2
+    pos_elem = pos+16+8*n_dim
+
+    # positions of all the elements (each element has a length and a value)
+    idx_elem = np.concatenate(([0], np.cumsum(n_elem)))
+    pos_elem = np.repeat(pos_elem-(4+size)*idx_elem[:-1], n_elem)
+    pos_elem += (4+size)*np.arange(idx_elem[-1])+4
+
+    # get the values
+    idx = np.add.outer(pos_elem, np.arange(size))
+    val = buf[idx].view(dtype).reshape(len(pos_elem)).astype(dtype_out)
+
+    # split the arrays
+    shape = []
+    for n_dim_tmp, dim_1_tmp, dim_2_tmp in zip(n_dim.tolist(), dim_1.tolist(), dim_2.tolist()):
+        if n_dim_tmp < 2:
+            shape.append((dim_1_tmp,))
+        else:
+            shape.append((dim_1_tmp, dim_2_tmp))
+    idx_elem = idx_elem.tolist()
+    var = [val[idx_1:idx_2].reshape(shape_tmp) for idx_1, idx_2, shape_tmp in zip(idx_elem[:-1], idx_elem[1:], shape)]
+    var = pd.Series(var, dtype=object)
+
+    return var
+
+
+def _get_copy_column(buf, pos, var_type):
+    """
+    Transform a column from SQL binary format to Python (array or column of arrays).
+    The REAL values are the exact float32 values widened to float64 (e.g., 0.1 is 0.10000000149).
+    This differs from the text format which is returning the shortest decimal representation.
+    """
 
-    # parse
     if var_type == "int":
-        var = var.astype(int)
-    elif var_type == "bool":
-        var = var.astype(bool)
+        var = _get_copy_scalar(buf, pos, ">i4", np.int64)
     elif var_type == "float":
-        var = var.astype(float)
+        var = _get_copy_scalar(buf, pos, ">f4", np.float64)
+    elif var_type == "bool":
+        var = _get_copy_scalar(buf, pos, "?", bool)
     elif var_type in ["int_1D", "int_2D"]:
-        var = var.apply(lambda row: np.array(row, dtype=np.int64))
+        var = _get_copy_array(buf, pos, ">i4", np.int64)
     elif var_type in ["float_1D", "float_2D"]:
-        var = var.apply(lambda row: np.array(row, dtype=np.float64))
+        var = _get_copy_array(buf, pos, ">f4", np.float64)
     elif var_type in ["bool_1D", "bool_2D"]:
-        var = var.apply(lambda row: np.array(row, dtype=bool))
+        var = _get_copy_array(buf, pos, "?", bool)
     else:
         raise ValueError("invalid type")
 
     return var
 
 
+def _get_copy_frame(buf, pos_field, var_sql):
+    """
+    Transform SQL designs into a DataFrame (deserialize from the PostgreSQL binary copy format).
+    """
+
+    # cast and deserialize (column by column)
+    data = {}
+    for (var_name, var_type), pos in zip(var_sql, pos_field):
+        data[var_name] = _get_copy_column(buf, pos, var_type)
+
+    # create DataFrame
+    data = pd.DataFrame(data)
+
+    return data
+
+
+class _CopyReader:
+    """
+    File object parsing a binary copy stream into a DataFrame (PostgreSQL binary copy format).
+    The stream is parsed by chunks during the transfer (bounded memory for the raw data).
+    """
+
+    def __init__(self, var_sql, chunk):
+        """
+        Constructor.
+        """
+
+        # assign
+        self.var_sql = var_sql
+        self.chunk = chunk
+
+        # layout of the rows
+        self.layout = _get_copy_layout([var_type for (var_name, var_type) in var_sql])
+
+        # parsing state
+        self.buf_list = []
+        self.is_header = False
+        self.is_end = False
+
+        # parsed designs
+        self.data_list = []
+
+    def _get_parse(self):
+        """
+        Parse the complete rows and keep the remaining raw data.
+        """
+
+        # assemble the raw data
+        buf = np.frombuffer(b"".join(self.buf_list), dtype=np.uint8)
+
+        # parse the header
+        pos = 0
+        if not self.is_header:
+            pos = _get_copy_header(buf)
+            if pos is None:
+                return
+            self.is_header = True
+
+        # parse the complete rows (nothing after the trailer)
+        if self.is_end:
+            assert len(buf) == 0, "invalid copy data (trailer)"
+            return
+        (pos_field, pos, self.is_end) = _get_copy_position(buf, pos, self.layout, len(self.var_sql))
+
+        # deserialize the designs
+        if len(pos_field[0]) > 0:
+            self.data_list.append(_get_copy_frame(buf, pos_field, self.var_sql))
+
+        # keep the remaining data
+        self.buf_list = [bytes(buf[pos:])]
+
+    def write(self, buf):
+        """
+        Add raw data (called by the copy command).
+        Parse the data once a chunk is available (each message is typically a row).
+        """
+
+        self.buf_list.append(buf)
+        if len(self.buf_list) >= self.chunk:
+            self._get_parse()
+
+    def get_data(self):
+        """
+        Parse the remaining data and get the DataFrame with all the designs.
+        """
+
+        # parse the remaining data
+        self._get_parse()
+        assert self.is_end, "invalid copy data (incomplete)"
+
+        # empty result
+        if len(self.data_list) == 0:
+            buf = np.empty(0, dtype=np.uint8)
+            pos_field = [np.empty(0, dtype=np.int64)]*len(self.var_sql)
+            return _get_copy_frame(buf, pos_field, self.var_sql)
+
+        # assemble the chunks
+        data = pd.concat(self.data_list, ignore_index=True)
+
+        return data
+
+
 class _PostgreSql:
     """
     Class managing the connection to the PostgreSQL database.
@@ -121,17 +463,40 @@ class _PostgreSql:
         """
 
         # assign credential and session parameters
-        self.credential = credential
+        self.credential = self._get_socket(credential, connection["socket"])
         self.session = session
         self.robust = robust
 
         # assign connection parameters
         self.retry = connection["retry"]
         self.delay = connection["delay"]
+        self.delay_max = connection["delay_max"]
 
         # connection init
         self.conn = None
 
+    @staticmethod
+    def _get_socket(credential, socket):
+        """
+        Replace the local TCP connection by a UNIX socket (if the socket exists).
+        """
+
+        # check if the host is local
+        if credential["host"] not in ["localhost", "127.0.0.1"]:
+            return credential
+
+        # check if the socket exists
+        if not socket:
+            return credential
+        if not os.path.exists(os.path.join(socket, ".s.PGSQL.%s" % credential["port"])):
+            return credential
+
+        # the socket directory is used as the host
+        credential = dict(credential)
+        credential["host"] = socket
+
+        return credential
+
     @staticmethod
     def _retry_fail(function):
         """
@@ -139,6 +504,7 @@ class _PostgreSql:
         Reconnect and retry on failures.
         """
 
+        @functools.wraps(function)
         def wrap_function(self, *args):
             """
             Run the decorated function.
@@ -153,19 +519,20 @@ class _PostgreSql:
                 if not self.robust:
                     raise ex
 
-                # reconnect and retry the operation
+                # reconnect (if the connection is lost) and retry the operation
                 for i in range(self.retry):
                     try:
-                        # close old connection
-                        self.close()
-
-                        # restart a new connection
-                        self.connect()
+                        # replace a broken connection
+                        if self.conn.closed:
+                            self.close()
+                            self.connect()
 
                         # retry the operation
                         return function(self, *args)
                     except psycopg2.Error:
-                        time.sleep(self.delay)
+                        # capped exponential backoff with jitter (avoid synchronized retries)
+                        delay = min(self.delay*(2**i), self.delay_max)
+                        time.sleep(delay+random.uniform(0, self.delay))
 
                 # failure after number of retry is exceeded
                 raise ex
@@ -217,13 +584,45 @@ class _PostgreSql:
             cursor.execute(cmd, param)
 
     @_retry_fail
-    def run_batch(self, cmd, param):
+    def run_copy(self, cmd, fct_fid, n_chunk):
         """
-        Run several SQL commands (without results).
+        Run several SQL copy commands in a single transaction (data read from file objects).
+        The file objects are generated for each chunk (bounded memory, replay after failures).
+        The next chunk is generated in a thread while the current chunk is copied.
         """
 
+        with self.conn.cursor() as cursor, concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            try:
+                cursor.execute("BEGIN")
+                future = executor.submit(fct_fid, 0)
+                for idx in range(n_chunk):
+                    fid = future.result()
+                    if (idx+1) < n_chunk:
+                        future = executor.submit(fct_fid, idx+1)
+                    cursor.copy_expert(cmd, fid)
+                cursor.execute("COMMIT")
+            except Exception as ex:
+                if not self.conn.closed:
+                    cursor.execute("ROLLBACK")
+                raise ex
+
+    @_retry_fail
+    def run_copy_fetch(self, cmd, param, fct_fid):
+        """
+        Run a SQL query and fetch all the results with a binary copy (written into a file object).
+        The file object is generated for each try (replay after failures).
+        """
+
+        # file object receiving the data
+        fid = fct_fid()
+
+        # wrap the query into a copy command
         with self.conn.cursor() as cursor:
-            psycopg2.extras.execute_batch(cursor, cmd, param)
+            cmd = cursor.mogrify(cmd, param).decode(psycopg2.extensions.encodings[self.conn.encoding])
+            cmd = "COPY (%s) TO STDOUT WITH (FORMAT BINARY)" % cmd
+            cursor.copy_expert(cmd, fid)
+
+        return fid
 
     @_retry_fail
     def run_fetch(self, cmd, param):
@@ -259,6 +658,7 @@ class ManageSql:
         # assign
         self.study = data_database["study"]
         self.design = data_database["design"]
+        self.chunk = connection["chunk"]
 
         # object managing the database connection
         self.sql = _PostgreSql(credential, session, connection, robust)
@@ -266,6 +666,9 @@ class ManageSql:
         # assign the variable description
         self.var_sql = var_sql
 
+        # cache for the formatted SQL queries (the tables and variables are constant)
+        self.query_cache = {}
+
     def connect(self):
         """
         Create a connection to the database.
@@ -282,9 +685,14 @@ class ManageSql:
 
     def _get_query_table(self, cmd):
         """
-        Format a SQL query (replace table names and design variable names.
+        Format a SQL query (replace table names and design variable names).
+        The formatted queries are cached.
         """
 
+        # get the cached query
+        if cmd in self.query_cache:
+            return self.query_cache[cmd]
+
         # SQL commands for creating the table
         var_type = []
 
@@ -304,72 +712,95 @@ class ManageSql:
             var_insert.append(psycopg2.sql.Placeholder())
 
         # construct the SQL query
-        cmd = psycopg2.sql.SQL(cmd).format(
+        query = psycopg2.sql.SQL(cmd).format(
             study=psycopg2.sql.Identifier(self.study),
             design=psycopg2.sql.Identifier(self.design),
+            index=psycopg2.sql.Identifier("%s_study_idx" % self.design),
             var_type=psycopg2.sql.SQL(', ').join(var_type),
             var_name=psycopg2.sql.SQL(', ').join(var_name),
             var_insert=psycopg2.sql.SQL(', ').join(var_insert),
         )
 
-        return cmd
+        # cache the query
+        self.query_cache[cmd] = query
+
+        return query
 
-    def _get_data_from_sql(self, data):
+    def _get_data_from_sql(self):
         """
-        Transform SQL designs into a DataFrame (deserialize).
+        Get a file object transforming SQL designs into a DataFrame (deserialize).
         """
 
         # get all design variables
-        var = ["design_id", "study_id"]
-        for (var_name, var_type) in self.var_sql:
-            var.append(var_name)
+        var_sql = [("design_id", "int"), ("study_id", "int")]+self.var_sql
 
-        # create DataFrame
-        data = pd.DataFrame(data, columns=var)
+        # file object parsing the binary copy stream
+        fid = _CopyReader(var_sql, self.chunk)
 
-        # cast and deserialize
-        for (var_name, var_type) in self.var_sql:
-            data[var_name] = _get_df_cast(var_type, data[var_name])
-
-        return data
+        return fid
 
-    def _get_data_to_sql(self, data):
+    def _get_data_to_sql(self, study_id, data):
         """
-        Transform a Dataframe into SQL designs (serialize).
+        Transform a Dataframe into SQL designs (serialize into the PostgreSQL binary copy format).
         """
 
-        # SQL parameters
-        param = []
+        # binary file
+        fid = io.BytesIO()
+
+        # header (signature, flags, and header extension)
+        fid.write(b"PGCOPY\n\xff\r\n\x00"+struct.pack("!ii", 0, 0))
+
+        # number of fields (study and design parameters) and study field
+        n_design = len(data)
+        prefix = struct.pack("!hii", 1+len(self.var_sql), 4, study_id)
 
-        # cast and serialize the design parameters
+        # cast and serialize the design parameters (column by column)
+        field_list = [[prefix]*n_design]
         for (var_name, var_type) in self.var_sql:
-            # cast and serialize
             if var_name in data:
-                var = data[var_name]
-                var = _get_sql_cast(var_type, var)
+                field = _get_sql_column(var_type, data[var_name])
             else:
-                var = None
+                field = [struct.pack("!i", -1)]*n_design
+            field_list.append(field)
 
-            # add value
-            param.append(var)
+        # assemble the designs (row by row)
+        for field in zip(*field_list):
+            fid.write(b"".join(field))
 
-        return param
+        # trailer
+        fid.write(struct.pack("!h", -1))
 
-    def get_stat(self):
+        return fid
+
+    def get_stat(self, exact=True):
         """
         Get statistics about the number of studies and designs.
         Get the total database and table size.
+        If not exact, the number of rows is estimated from the catalog (no table scan).
+        The estimate is only updated by ANALYZE (stale after adding designs).
         """
 
         # get command
-        cmd = (
-            "SELECT\n"
-            "(SELECT pg_database_size(current_database())) AS n_total_byte,\n"
-            "(SELECT pg_total_relation_size('{study}')) AS n_study_byte,\n"
-            "(SELECT pg_total_relation_size('{design}')) AS n_design_byte,\n"
-            "(SELECT COUNT(*) FROM {study}) AS n_study,\n"
-            "(SELECT COUNT(*) FROM {design}) AS n_design\n"
-        )
+        if exact:
+            cmd = (
+                "SELECT\n"
+                "(SELECT pg_database_size(current_database())) AS n_total_byte,\n"
+                "(SELECT pg_total_relation_size('{study}')) AS n_study_byte,\n"
+                "(SELECT pg_total_relation_size('{design}')) AS n_design_byte,\n"
+                "(SELECT COUNT(*) FROM {study}) AS n_study,\n"
+                "(SELECT COUNT(*) FROM {design}) AS n_design\n"
+            )
+        else:
+            cmd = (
+                "SELECT\n"
+                "(SELECT pg_database_size(current_database())) AS n_total_byte,\n"
+                "(SELECT pg_total_relation_size('{study}')) AS n_study_byte,\n"
+                "(SELECT pg_total_relation_size('{design}')) AS n_design_byte,\n"
+                "(SELECT CASE WHEN reltuples >= 0 THEN reltuples::bigint ELSE (SELECT COUNT(*) FROM {study}) END\n"
+                "FROM pg_class WHERE oid = '{study}'::regclass) AS n_study,\n"
+                "(SELECT CASE WHEN reltuples >= 0 THEN reltuples::bigint ELSE (SELECT COUNT(*) FROM {design}) END\n"
+                "FROM pg_class WHERE oid = '{design}'::regclass) AS n_design\n"
+            )
 
         # execute query
         cmd = self._get_query_table(cmd)
@@ -455,6 +886,7 @@ class ManageSql:
             "        FOREIGN KEY(study_id)\n"
             "        REFERENCES {study}(study_id)\n"
             ");\n"
+            "CREATE INDEX IF NOT EXISTS {index} ON {design}(study_id, design_id);\n"
         )
 
         # execute query
@@ -502,6 +934,49 @@ class ManageSql:
         cmd = self._get_query_table(cmd)
         self.sql.run_cmd(cmd, [name, name])
 
+    def create_study_many(self, name_list):
+        """
+        Create several new studies (single query).
+        """
+
+        # check
+        name_list = [name for name in name_list if name is not None]
+        if len(name_list) == 0:
+            return
+
+        # get command
+        cmd = (
+            "INSERT INTO {study}(name)\n"
+            "SELECT unnest(%s::text[])\n"
+            "ON CONFLICT DO NOTHING\n"
+        )
+
+        # execute query
+        cmd = self._get_query_table(cmd)
+        self.sql.run_cmd(cmd, [name_list])
+
+    def delete_study_many(self, name_list):
+        """
+        Delete several studies (single query).
+        """
+
+        # check
+        name_list = [name for name in name_list if name is not None]
+        if len(name_list) == 0:
+            return
+
+        # get command
+        cmd = (
+            "DELETE FROM {design}\n"
+            "WHERE study_id IN (SELECT study_id FROM {study} WHERE name = ANY(%s));\n"
+            "DELETE FROM {study}\n"
+            "WHERE name = ANY(%s);\n"
+        )
+
+        # execute query
+        cmd = self._get_query_table(cmd)
+        self.sql.run_cmd(cmd, [name_list, name_list])
+
     def rename_study(self, name_old, name_new):
         """
         Rename a study.
@@ -522,6 +997,28 @@ class ManageSql:
         cmd = self._get_query_table(cmd)
         self.sql.run_cmd(cmd, [name_new, name_old])
 
+    def rename_study_many(self, name_dict):
+        """
+        Rename several studies (single query).
+        """
+
+        # check
+        name_dict = {k: v for k, v in name_dict.items() if (k is not None) and (v is not None)}
+        if len(name_dict) == 0:
+            return
+
+        # get command
+        cmd = (
+            "UPDATE {study}\n"
+            "SET name = tmp.name_new\n"
+            "FROM unnest(%s::text[], %s::text[]) AS tmp(name_old, name_new)\n"
+            "WHERE {study}.name = tmp.name_old\n"
+        )
+
+        # execute query
+        cmd = self._get_query_table(cmd)
+        self.sql.run_cmd(cmd, [list(name_dict.keys()), list(name_dict.values())])
+
     def limit_study(self, name, limit):
         """
         Limit the number of designs for a study (truncation).
@@ -531,41 +1028,59 @@ class ManageSql:
         if (name is None) or (limit is None):
             return
 
-        # get command
+        # get command (the designs are kept in insertion order, index scan)
         cmd = (
             "DELETE FROM {design}\n"
-            "WHERE ctid IN (\n"
-            "    SELECT ctid\n"
+            "WHERE study_id = (SELECT study_id FROM {study} WHERE name = %s)\n"
+            "AND design_id >= (\n"
+            "    SELECT design_id\n"
             "    FROM {design}\n"
             "    WHERE study_id = (SELECT study_id FROM {study} WHERE name = %s)\n"
-            "    OFFSET %s\n"
+            "    ORDER BY design_id\n"
+            "    OFFSET %s LIMIT 1\n"
             ")\n"
         )
 
         # execute query
         cmd = self._get_query_table(cmd)
-        self.sql.run_cmd(cmd, [name, limit])
+        self.sql.run_cmd(cmd, [name, name, limit])
 
     def add_design(self, name, data):
         """
         Add new designs to an existing study.
         """
 
-        # get command
+        # check
+        if len(data) == 0:
+            return
+
+        # get the study
+        cmd = "SELECT study_id FROM {study} WHERE name = %s"
+        cmd = self._get_query_table(cmd)
+        study_id = self.sql.run_fetch(cmd, [name])
+        if len(study_id) != 1:
+            raise ValueError("invalid study name")
+        (study_id,) = study_id.pop()
+
+        # get command (binary copy)
         cmd = (
-            "INSERT INTO {design}(study_id, {var_name})\n"
-            "VALUES ((SELECT study_id FROM {study} WHERE name = %s), {var_insert})\n"
+            "COPY {design}(study_id, {var_name})\n"
+            "FROM STDIN WITH (FORMAT BINARY)\n"
         )
 
-        # get the serialized parameters
-        param = []
-        for idx_tmp, data_tmp in data.iterrows():
-            param_tmp = self._get_data_to_sql(data_tmp)
-            param.append([name] + param_tmp)
+        # function serializing the designs (for a given chunk)
+        def fct_fid(idx):
+            data_tmp = data.iloc[idx*self.chunk:(idx+1)*self.chunk]
+            fid = self._get_data_to_sql(study_id, data_tmp)
+            fid.seek(0)
+            return fid
+
+        # number of chunks
+        n_chunk = (len(data)+self.chunk-1)//self.chunk
 
         # execute query
         cmd = self._get_query_table(cmd)
-        self.sql.run_batch(cmd, param)
+        self.sql.run_copy(cmd, fct_fid, n_chunk)
 
     def get_design(self, name):
         """
@@ -580,10 +1095,10 @@ class ManageSql:
 
         # execute query
         cmd = self._get_query_table(cmd)
-        data = self.sql.run_fetch(cmd, [name])
+        data = self.sql.run_copy_fetch(cmd, [name], self._get_data_from_sql)
 
         # deserialize
-        data = self._get_data_from_sql(data)
+        data = data.get_data()
 
         return data
 
@@ -619,21 +1134,26 @@ class ManageSql:
         else:
             cmd_offset = "OFFSET NULL"
 
-        # assemble where command
+        # assemble command (injection safe)
+        #   - for random queries, the design ids are sampled first (index scan, narrow rows)
+        #   - for random queries, only the sampled designs are fetched (shuffled afterwards)
         if random:
-            cmd_order = "ORDER BY RANDOM()"
+            cmd_sample = "SELECT design_id FROM {design} WHERE %s ORDER BY RANDOM() %s %s" % (cmd_name, cmd_limit, cmd_offset)
+            cmd = "SELECT * FROM {design} WHERE design_id IN (%s)" % cmd_sample
         else:
-            cmd_order = "ORDER BY design_id"
-
-        # assemble command (injection safe)
-        cmd = "SELECT * FROM {design} WHERE %s %s %s %s" % (cmd_name, cmd_order, cmd_limit, cmd_offset)
+            cmd = "SELECT * FROM {design} WHERE %s ORDER BY design_id %s %s" % (cmd_name, cmd_limit, cmd_offset)
 
         # execute query
         cmd = self._get_query_table(cmd)
-        data = self.sql.run_fetch(cmd, param)
+        data = self.sql.run_copy_fetch(cmd, param, self._get_data_from_sql)
 
         # deserialize
-        data = self._get_data_from_sql(data)
+        data = data.get_data()
+
+        # shuffle the sampled designs (without altering the global random state)
+        if random:
+            idx = np.random.default_rng().permutation(len(data))
+            data = data.iloc[idx].reset_index(drop=True)
 
         return data
 
@@ -655,23 +1175,39 @@ class ManageSql:
             check=True,
         )
 
-    def dump(self, filename):
+    @staticmethod
+    def _get_jobs(n_jobs):
         """
-        Create a dump of the database.
+        Get the number of parallel jobs for the dump and restore.
         """
 
-        # check file
-        try:
-            with open(filename, mode='wb'):
-                pass
-        except OSError:
-            raise RuntimeError("invalid filename for the database dump")
+        # default is half of the cores
+        if n_jobs is None:
+            n_jobs = max(1, os.cpu_count() // 2)
+
+        # check value
+        assert n_jobs >= 1, "invalid number of jobs"
+
+        return n_jobs
+
+    def dump(self, filename, n_jobs=None):
+        """
+        Create a dump of the database (directory format).
+        """
+
+        # check directory (created by the dump)
+        if os.path.exists(filename):
+            if (not os.path.isdir(filename)) or (len(os.listdir(filename)) > 0):
+                raise RuntimeError("invalid directory for the database dump")
 
         # get credential
         (opt, env) = self.sql.get_credential()
 
-        # dump command
-        cmd = ["pg_dump", "-Fc", "-f", filename]
+        # get the number of jobs
+        n_jobs = self._get_jobs(n_jobs)
+
+        # dump command (parallel with light compression)
+        cmd = ["pg_dump", "-Fd", "-j", str(n_jobs), "-Z", "1", "-f", filename]
 
         # dump the database
         subprocess.run(
@@ -680,23 +1216,23 @@ class ManageSql:
             check=True,
         )
 
-    def restore(self, filename):
+    def restore(self, filename, n_jobs=None):
         """
-        Restore the database from a dump.
+        Restore the database from a dump (directory or custom format).
         """
 
-        # check file
-        try:
-            with open(filename, mode='rb'):
-                pass
-        except OSError:
+        # check file or directory
+        if not os.path.exists(filename):
             raise RuntimeError("invalid filename for the database dump")
 
         # get credential
         (opt, env) = self.sql.get_credential()
 
-        # restore command
-        cmd = ["pg_restore", "--clean", "--if-exists", "--no-privileges", filename]
+        # get the number of jobs
+        n_jobs = self._get_jobs(n_jobs)
+
+        # restore command (parallel)
+        cmd = ["pg_restore", "--clean", "--if-exists", "--no-privileges", "--jobs", str(n_jobs), filename]
 
         # restore the database
         subprocess.run(
@@ -10,9 +10,10 @@ import os
 import random
 import pickle
 import importlib
+import contextvars
 
-# global variable for controlling trace generation
-TRACE = True
+# context variable for controlling trace generation (thread-safe)
+TRACE = contextvars.ContextVar("trace", default=True)
 
 
 class RandomGeometryError(RuntimeError):
@@ -28,15 +29,12 @@ def trace_reproduce(module, function, args):
     Reproduce a traceback failure.
     """
 
-    # global used to temporarily disable tracing
-    global TRACE
-
     # dynamic import
     module = importlib.import_module(module)
     function = getattr(module, function)
 
     # disable traceback (to avoid the generation of a new trace file)
-    TRACE = False
+    token = TRACE.set(False)
 
     # call the function
     try:
@@ -44,7 +42,7 @@ def trace_reproduce(module, function, args):
     except Exception as ex:
         raise ex
     finally:
-        TRACE = True
+        TRACE.reset(token)
 
 
 def trace_error(tag, function, args, ex):
@@ -53,7 +51,7 @@ def trace_error(tag, function, args, ex):
     """
 
     # if traceback is disabled, show the failure
-    if not TRACE:
+    if not TRACE.get():
         raise ex
 
     # trace folder storage
@@ -12,7 +12,6 @@ __license__ = "Mozilla Public License Version 2.0"
 import os
 import sys
 import argparse
-import tempfile
 import scisave
 import scilogger
 import numpy as np
@@ -36,15 +35,16 @@ def _get_cad_shape(cad, shape, scaling):
     # construct the shape
     if valid:
         if geom == "trace":
-            data = scaling*data.copy()
+            data = scaling*data
             cad = cad.polyline(data)
             cad = cad.close()
         elif geom == "pad":
             (coord, diameter) = data
-            coord = scaling*coord.copy()
-            diameter = scaling*diameter.copy()
-            cad = cad.moveTo(coord[0], coord[1])
-            cad.circle(diameter/2)
+            x = scaling*float(coord[0])
+            y = scaling*float(coord[1])
+            r = scaling*float(diameter)/2
+            cad = cad.moveTo(x, y)
+            cad = cad.circle(r)
         else:
             raise ValueError("invalid shape")
 
@@ -72,7 +72,27 @@ def _get_cad_object(cad_add, cad_sub, z_min, z_max, scaling):
     return cad
 
 
-def _get_cad_layer(geom, position, scaling, select):
+def _get_cad_select(position, select):
+    """
+    Get the stack positions of the specified layers (indexed by layer).
+    """
+
+    # get absolute stack position
+    z_vec = np.append(0.0, np.cumsum(position))-np.sum(position)/2
+
+    # get stack position for the given layers (the layers outside the stack contain no objects)
+    select_dict = {}
+    for select_tmp in select:
+        if (np.max(select_tmp)+1) >= len(z_vec):
+            continue
+        z_min = z_vec[np.min(select_tmp)+0]
+        z_max = z_vec[np.max(select_tmp)+1]
+        select_dict.setdefault(tuple(np.ravel(select_tmp).tolist()), []).append((z_min, z_max))
+
+    return select_dict
+
+
+def _get_cad_layer(geom, select_dict, scaling):
     """
     Get the CAD objects located in the specified layers.
     """
@@ -86,17 +106,8 @@ def _get_cad_layer(geom, position, scaling, select):
     cad_list = []
 
     # get the shapes
-    for select_tmp in select:
-        if np.array_equal(layer, select_tmp):
-            # get absolute stack position
-            z_vec = np.append(0.0, np.cumsum(position))-np.sum(position)/2
-
-            # get stack position for the given layer
-            z_min = z_vec[np.min(select_tmp)+0]
-            z_max = z_vec[np.max(select_tmp)+1]
-
-            # create the CAD object
-            cad_list.append(_get_cad_object(cad_add, cad_sub, z_min, z_max, scaling))
+    for z_min, z_max in select_dict.get(tuple(np.ravel(layer).tolist()), []):
+        cad_list.append(_get_cad_object(cad_add, cad_sub, z_min, z_max, scaling))
 
     return cad_list
 
@@ -104,15 +115,44 @@ def _get_cad_layer(geom, position, scaling, select):
 def _get_cad_merge(cad_list):
     """
     Compute the union between several CAD objects.
+    The union is computed with a balanced tree (pairwise unions).
+    The intermediate objects are kept small (faster boolean operations).
     """
 
-    # create a union
+    # check for empty objects
     if len(cad_list) == 0:
-        cad = None
-    else:
-        cad = cq.Workplane("XY")
-        for cad_tmp in cad_list:
-            cad = cad.union(cad_tmp)
+        return None
+
+    # merge the objects by pairs until a single object remains
+    while len(cad_list) > 1:
+        cad_tmp = [cad_list[idx].union(cad_list[idx+1]) for idx in range(0, len(cad_list)-1, 2)]
+        if (len(cad_list) % 2) == 1:
+            cad_tmp.append(cad_list[-1])
+        cad_list = cad_tmp
+
+    # extract the union
+    cad = cad_list[0]
+
+    return cad
+
+
+def _get_cad_tag(geom_all, position, scaling, select):
+    """
+    Construct the CAD object for the specified layers (union of the objects).
+    """
+
+    # get the stack positions of the layers
+    select_dict = _get_cad_select(position, select)
+
+    # create list for the CAD objects
+    cad_list = []
+
+    # create the CAD objects
+    for geom in geom_all:
+        cad_list += _get_cad_layer(geom, select_dict, scaling)
+
+    # merge the CAD objects
+    cad = _get_cad_merge(cad_list)
 
     return cad
 
@@ -136,18 +176,24 @@ def get_cad(data_vector, stack_dict, scaling):
     with LOGGER.BlockIndent():
         for tag, select in stack_dict.items():
             LOGGER.info("parse object: %s" % tag)
+            cad_dict[tag] = _get_cad_tag(geom_all, position, scaling, select)
+
+    return cad_dict
 
-            # create list for the CAD objects
-            cad_list = []
 
-            # create the CAD objects
-            for geom in geom_all:
-                cad_list += _get_cad_layer(geom, position, scaling, select)
+def _write_cad_tag(folder, tolerance, tag, cad):
+    """
+    Export a CAD object to STL/STEP files.
+    """
 
-            # add data
-            cad_dict[tag] = _get_cad_merge(cad_list)
+    # get the filenames
+    filename_stl = os.path.join(folder, "%s.stl" % tag)
+    filename_step = os.path.join(folder, "%s.step" % tag)
 
-    return cad_dict
+    # write the files
+    if cad is not None:
+        cad.val().exportStl(filename_stl, tolerance=tolerance)
+        cad.val().exportStep(filename_step)
 
 
 def write_cad(folder, cad_dict, tolerance):
@@ -163,15 +209,7 @@ def write_cad(folder, cad_dict, tolerance):
     with LOGGER.BlockIndent():
         for tag, cad in cad_dict.items():
             LOGGER.info("write object: %s" % tag)
-
-            # get the filenames
-            filename_stl = os.path.join(folder, "%s.stl" % tag)
-            filename_step = os.path.join(folder, "%s.step" % tag)
-
-            # write the files
-            if cad is not None:
-                cad.val().exportStl(filename_stl, tolerance=tolerance)
-                cad.val().exportStep(filename_step)
+            _write_cad_tag(folder, tolerance, tag, cad)
 
 
 def get_mesh(cad_dict, tolerance):
@@ -188,12 +226,13 @@ def get_mesh(cad_dict, tolerance):
         for tag, cad in cad_dict.items():
             LOGGER.info("mesh object: %s" % tag)
 
-            # export a mesh and load it in PyVista
+            # tessellate the CAD object and create the PyVista mesh (in memory)
             if cad is not None:
-                (_, filename) = tempfile.mkstemp(suffix=".stl")
-                cad.val().exportStl(filename, tolerance=tolerance)
-                mesh = pv.read(filename)
-                os.remove(filename)
+                (vertices, triangles) = cad.val().tessellate(tolerance)
+                points = np.array([vertex.toTuple() for vertex in vertices], dtype=np.float64).reshape(-1, 3)
+                triangles = np.array(triangles, dtype=np.int64).reshape(-1, 3)
+                faces = np.insert(triangles, 0, 3, axis=1).flatten()
+                mesh = pv.PolyData(points, faces)
             else:
                 mesh = pv.PolyData()
 
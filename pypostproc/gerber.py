@@ -33,19 +33,17 @@ def _get_gerber_pad(gerber, name, data, options):
     offset_x = options["offset_x"]
     offset_y = options["offset_y"]
 
-    # extract and copy
+    # extract
     (coord, diameter) = data
-    coord = coord.copy()
-    diameter = diameter.copy()
 
-    # scaling and offset
-    diameter = scaling*diameter
-    coord[0] = scaling*(coord[0]+offset_x)
-    coord[1] = scaling*(coord[1]+offset_y)
+    # scaling and offset (scalars, no copies)
+    diameter = scaling*float(diameter)
+    x = scaling*(float(coord[0])+offset_x)
+    y = scaling*(float(coord[1])+offset_y)
 
     # create and add GERBER circle
     pad = Circle(diameter, name)
-    gerber.add_pad(pad, tuple(coord))
+    gerber.add_pad(pad, (x, y))
 
 
 def _get_gerber_trace(gerber, name, data, options):
@@ -58,18 +56,19 @@ def _get_gerber_trace(gerber, name, data, options):
     offset_x = options["offset_x"]
     offset_y = options["offset_y"]
 
-    # extract and copy
-    data = data.copy()
+    # allocate the polygon (with the closing point)
+    n_vertex = len(data)
+    poly_data = np.empty((n_vertex+1, 2), dtype=np.float64)
 
-    # scaling and offset
-    data[:, 0] = scaling*(data[:, 0]+offset_x)
-    data[:, 1] = scaling*(data[:, 1]+offset_y)
+    # offset and scaling (in place)
+    np.add(data, (offset_x, offset_y), out=poly_data[:n_vertex])
+    np.multiply(poly_data[:n_vertex], scaling, out=poly_data[:n_vertex])
 
     # close the polygon
-    data = np.vstack((data, data[0]))
+    poly_data[n_vertex] = poly_data[0]
 
     # create and add GERBER trace
-    poly = UserPolygon(tuple(map(tuple, data)), name)
+    poly = UserPolygon(tuple(map(tuple, poly_data.tolist())), name)
     gerber.add_pad(poly, (0.0, 0.0))
 
 
@@ -78,42 +77,60 @@ def _get_gerber_shape(gerber, name, shape, options):
     Add a single shape to the GERBER data.
     """
 
+    # skip the invalid shapes
+    if not shape["valid"]:
+        return
+
     # extract
     geom = shape["geom"]
     data = shape["data"]
-    valid = shape["valid"]
 
     # construct the shape
-    if valid:
-        if geom == "trace":
-            _get_gerber_trace(gerber, name, data, options)
-        elif geom == "pad":
-            _get_gerber_pad(gerber, name, data, options)
-        else:
-            raise ValueError("invalid shape")
+    if geom == "trace":
+        _get_gerber_trace(gerber, name, data, options)
+    elif geom == "pad":
+        _get_gerber_pad(gerber, name, data, options)
+    else:
+        raise ValueError("invalid shape")
 
 
-def _get_gerber_geometry(gerber, count, tag, layer, cad, options, select):
+def _get_gerber_geometry(gerber, count, tag, layer, cad, options, select_dict):
     """
     Add a geometry to the GERBER data (for a specific layer).
     """
 
-    for select_tmp in select:
-        if np.array_equal(layer, select_tmp):
-            for shape in cad:
-                # get name
-                name = "shape_%s_%d" % (tag, count)
+    # get the number of selected layers matching the geometry layer
+    n_select = select_dict.get(tuple(np.ravel(layer).tolist()), 0)
+
+    # add the shapes for each matching layer
+    for _ in range(n_select):
+        for shape in cad:
+            # get name
+            name = "shape_%s_%d" % (tag, count)
 
-                # update naming counter
-                count += 1
+            # update naming counter
+            count += 1
 
-                # add content
-                _get_gerber_shape(gerber, name, shape, options)
+            # add content
+            _get_gerber_shape(gerber, name, shape, options)
 
     return count
 
 
-def _get_gerber_layer(tag, geom_trace, geom_via, options, select):
+def _get_gerber_select(select):
+    """
+    Index the selected layers (number of occurrences of each layer).
+    """
+
+    select_dict = {}
+    for select_tmp in select:
+        key = tuple(np.ravel(select_tmp).tolist())
+        select_dict[key] = select_dict.get(key, 0)+1
+
+    return select_dict
+
+
+def _get_gerber_layer(tag, geom_trace, geom_via, options, select_dict):
     """
     Create a complete GERBER layer.
     """
@@ -131,7 +148,7 @@ def _get_gerber_layer(tag, geom_trace, geom_via, options, select):
         cad = geom["cad_add"]
 
         # add data
-        count = _get_gerber_geometry(gerber, count, tag, layer, cad, options, select)
+        count = _get_gerber_geometry(gerber, count, tag, layer, cad, options, select_dict)
 
     # populate vias in the layer
     for geom in geom_via:
@@ -140,7 +157,7 @@ def _get_gerber_layer(tag, geom_trace, geom_via, options, select):
         cad = geom["cad_sub"]
 
         # add data
-        count = _get_gerber_geometry(gerber, count, tag, layer, cad, options, select)
+        count = _get_gerber_geometry(gerber, count, tag, layer, cad, options, select_dict)
 
     return gerber
 
@@ -154,6 +171,9 @@ def get_gerber(data_vector, stack_dict, options):
     geom_trace = data_vector["geom_trace"]
     geom_via = data_vector["geom_via"]
 
+    # get the layers containing geometries
+    layer_set = {tuple(np.ravel(geom["layer"]).tolist()) for geom in geom_trace+geom_via}
+
     # dictionary containing the created layers
     gerber_dict = {}
 
@@ -162,7 +182,15 @@ def get_gerber(data_vector, stack_dict, options):
     with LOGGER.BlockIndent():
         for tag, select in stack_dict.items():
             LOGGER.info("parse gerber: %s" % tag)
-            gerber_dict[tag] = _get_gerber_layer(tag, geom_trace, geom_via, options, select)
+
+            # index the selected layers
+            select_dict = _get_gerber_select(select)
+
+            # skip the layers without geometries (empty layer)
+            if layer_set.isdisjoint(select_dict):
+                gerber_dict[tag] = DataLayer(tag)
+            else:
+                gerber_dict[tag] = _get_gerber_layer(tag, geom_trace, geom_via, options, select_dict)
 
     return gerber_dict
 
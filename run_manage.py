@@ -35,9 +35,11 @@ if __name__ == "__main__":
 
     # dump/restore utils
     parser_tmp = subparsers.add_parser("dump", help="dump the content of the database")
-    parser_tmp.add_argument("filename", type=str, help="name/path of the dump file")
+    parser_tmp.add_argument("filename", type=str, help="name/path of the dump directory")
+    parser_tmp.add_argument("-j", "--jobs", type=int, default=None, dest="n_jobs", help="number of parallel jobs")
     parser_tmp = subparsers.add_parser("restore", help="restore the content of the database")
-    parser_tmp.add_argument("filename", type=str, help="name/path of the dump file")
+    parser_tmp.add_argument("filename", type=str, help="name/path of the dump directory")
+    parser_tmp.add_argument("-j", "--jobs", type=int, default=None, dest="n_jobs", help="number of parallel jobs")
 
     # database study utils
     parser_tmp = subparsers.add_parser("delete", help="delete a study (including the associated designs)")
@@ -79,9 +81,9 @@ if __name__ == "__main__":
     elif args.command == "vacuum":
         manage.get_vacuum(data_database)
     elif args.command == "dump":
-        manage.get_dump(data_database, args.filename)
+        manage.get_dump(data_database, args.filename, args.n_jobs)
     elif args.command == "restore":
-        manage.get_restore(data_database, args.filename)
+        manage.get_restore(data_database, args.filename, args.n_jobs)
     elif args.command == "delete":
         manage.get_delete(data_database, args.name)
     elif args.command == "create":